@@ -3,17 +3,18 @@ from datetime import timedelta, datetime, timezone
 from typing import Any
 import secrets
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from authlib.integrations.starlette_client import OAuth
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash
-from app.api import deps
+from app.core.security import create_access_token
+from app.core.hashing import password_hasher
+from app.core.principal_cache import principal_cache
 # CHANGED: Added UserCreate, UserResponse to imports
-from app.schemas import UserLogin, Token, PasswordResetRequest, PasswordReset, UserCreate, UserResponse
+from app.schemas import UserLogin, PasswordResetRequest, PasswordReset, UserCreate, UserResponse
 from app.db.models import User
 from app.services.notification_service import notification_service
 # CHANGED: Added this import which was missing causing the 500 error
@@ -22,31 +23,51 @@ from app.services.user_service import user_service
 router = APIRouter()
 
 # --- Google OAuth Setup ---
-oauth = OAuth()
-oauth.register(
-    name='google',
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={'scope': 'openid email profile'},
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET
-)
+# Registered on first use: authlib (and httpx behind it) is slow to import
+# and only the Google sign-in routes need it
+_oauth = None
+
+def google_oauth():
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+
+        _oauth = OAuth()
+        _oauth.register(
+            name='google',
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={'scope': 'openid email profile'},
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET
+        )
+    return _oauth.google
 
 # --- NEW: Registration Endpoint ---
+# bcrypt-heavy routes are async and hand hashing to password_hasher's process pool
 @router.post("/register", response_model=UserResponse)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    return user_service.create_user(db, user_in)
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await user_service.create_user_async(db, user_in)
 
 @router.post("/login", response_model=dict)
-def login(user_in: UserLogin, db: Session = Depends(get_db)) -> Any:
+async def login(user_in: UserLogin, db: AsyncSession = Depends(get_async_db)) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = db.query(User).filter(User.username == user_in.username).first()
-    if not user or not verify_password(user_in.password, user.password):
+    result = await db.execute(select(User).where(User.username == user_in.username))
+    user = result.scalars().first()
+    is_valid, new_hash = False, None
+    if user and user.password:
+        is_valid, new_hash = await password_hasher.verify_and_update(user_in.password, user.password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
+
+    # Transparently upgrade hashes that pwd_context marks as deprecated/weaker
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
     
     return {
         "access_token": create_access_token(user.username, user.role, user.id),
@@ -61,15 +82,15 @@ async def login_google(request: Request):
     Redirects user to Google Login page.
     """
     redirect_uri = request.url_for('auth_google_callback')
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await google_oauth().authorize_redirect(request, redirect_uri)
 
 @router.get("/google/callback", name="auth_google_callback")
-async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
+async def auth_google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Callback from Google. Creates/Links user and logs them in.
     """
     try:
-        token = await oauth.google.authorize_access_token(request)
+        token = await google_oauth().authorize_access_token(request)
     except Exception as e:
         # Redirect to frontend with error
         return RedirectResponse(url=f"{settings.FRONTEND_URL}/?error=oauth_failed")
@@ -82,21 +103,21 @@ async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
     email = user_info['email']
 
     # 1. Check if user exists by Google ID
-    user = db.query(User).filter(User.google_id == google_id).first()
+    user = (await db.execute(select(User).where(User.google_id == google_id))).scalars().first()
     
     # 2. If not, check by email (and link accounts)
     if not user:
-        user = db.query(User).filter(User.email == email).first()
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
         if user:
             user.google_id = google_id
-            db.commit()
+            await db.commit()
     
     # 3. If still no user, create a new one
     if not user:
         base_username = email.split('@')[0].replace('.', '_')
         username = base_username
         counter = 1
-        while db.query(User).filter(User.username == username).first():
+        while (await db.execute(select(User.id).where(User.username == username))).first():
             username = f"{base_username}_{counter}"
             counter += 1
             
@@ -108,8 +129,8 @@ async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
             monthly_services_used={}
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     # 4. Generate Token
     access_token = create_access_token(user.username, user.role, user.id)
@@ -133,20 +154,19 @@ async def auth_google_callback(request: Request, db: Session = Depends(get_db)):
     return response
 
 @router.post("/forgot-password")
-def forgot_password(
+async def forgot_password(
     request: PasswordResetRequest, 
-    background_tasks: BackgroundTasks, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Triggers a password reset email if the user exists.
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
     if user:
         token = secrets.token_urlsafe(32)
         user.reset_token = token
         user.reset_token_expiry = datetime.now(timezone.utc) + timedelta(minutes=15)
-        db.commit()
         
         reset_link = f"{settings.FRONTEND_URL}/reset-password?token={token}"
         subject = "Your WashWise Password Reset Request"
@@ -155,32 +175,30 @@ def forgot_password(
             f"<p>Click <a href='{reset_link}'>here</a> to reset your password.</p>"
             f"<p>Link expires in 15 minutes.</p>"
         )
-        # Use the notification service we created
-        background_tasks.add_task(
-            notification_service.send_email, 
-            user.email, 
-            subject, 
-            html_content
-        )
+        # Queued in the same transaction as the token; the notification worker delivers it
+        notification_service.enqueue_email(db, user.email, subject, html_content)
+        await db.commit()
         
     # Always return success to prevent email enumeration attacks
     return {"message": "If an account with that email exists, a password reset link has been sent."}
 
 @router.post("/reset-password")
-def reset_password(request: PasswordReset, db: Session = Depends(get_db)):
+async def reset_password(request: PasswordReset, db: AsyncSession = Depends(get_async_db)):
     """
     Completes the password reset process.
     """
-    user = db.query(User).filter(User.reset_token == request.token).first()
+    result = await db.execute(select(User).where(User.reset_token == request.token))
+    user = result.scalars().first()
     if not user or not user.reset_token_expiry:
         raise HTTPException(status_code=400, detail="Invalid token")
         
     if user.reset_token_expiry.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
         raise HTTPException(status_code=400, detail="Token expired")
 
-    user.password = get_password_hash(request.new_password)
+    user.password = await password_hasher.hash(request.new_password)
     user.reset_token = None
     user.reset_token_expiry = None
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate_user(user.id)
     
     return {"message": "Password has been reset successfully."}
\ No newline at end of file
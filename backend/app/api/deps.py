@@ -2,35 +2,68 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import verify_password  # Used if you need custom auth logic
-from app.db.session import get_db
+from app.core.principal_cache import Principal, principal_cache
+from app.db.session import get_async_db
 from app.db.models import User
+from app.repositories.usage_repo import usage_repo
 
 # This tells FastAPI that the token comes from the "/auth/login" endpoint
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def resolve_principal(token: str, db: AsyncSession) -> Principal:
+    """
+    Read-only view of the caller. Served from principal_cache when possible,
+    which skips both the JWT signature check and the users query.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
         if username is None or role is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
+        raise _credentials_exception()
+
+    generation = principal_cache.generation(payload.get("id"))
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise _credentials_exception()
+
+    await usage_repo.load_usage_async(db, [user])
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, payload["exp"], generation)
+    return principal
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme), 
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    return await resolve_principal(token, db)
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """The caller as a session-bound User, for routes that modify it."""
+    # On a cache miss the user is already in this session's identity map (no query)
+    user = await db.get(User, principal.id)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        principal_cache.invalidate_user(principal.id)
+        raise _credentials_exception()
+    return user
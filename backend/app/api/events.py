@@ -0,0 +1,80 @@
+# app/api/events.py
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from app.api.deps import resolve_principal, _credentials_exception
+from app.core.config import settings
+from app.core.events import STAFF_CHANNEL, event_bus, user_channel
+from app.core.principal_cache import Principal
+from app.db.session import AsyncSessionLocal
+
+router = APIRouter()
+
+# Browsers can't set headers on EventSource/WebSocket, so ?token= is accepted too
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
+
+async def _authenticate(token: Optional[str]) -> Principal:
+    if not token:
+        raise _credentials_exception()
+    # Own short-lived session: a request-scoped one would stay checked out
+    # for as long as the client stays connected
+    async with AsyncSessionLocal() as db:
+        return await resolve_principal(token, db)
+
+def _channels_for(principal: Principal) -> list[str]:
+    """Staff follow the whole floor; customers only their own orders."""
+    if principal.role == "serviceman":
+        return [STAFF_CHANNEL]
+    return [user_channel(principal.id)]
+
+@router.websocket("/ws")
+async def order_updates_ws(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Pushes item_status / payment deltas as JSON; {"type": "resync"} means refetch."""
+    try:
+        principal = await _authenticate(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = event_bus.subscribe(*_channels_for(principal))
+    try:
+        while True:
+            message = await subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+            await websocket.send_json(message or {"type": "ping"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # client went away (noticed on the next send)
+    finally:
+        subscription.close()
+
+@router.get("/stream")
+async def order_updates_sse(
+    request: Request,
+    token: Optional[str] = Query(None),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    """Same deltas as /ws, as Server-Sent Events (event name = message type)."""
+    principal = await _authenticate(bearer or token)
+    subscription = event_bus.subscribe(*_channels_for(principal))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
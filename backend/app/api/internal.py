@@ -0,0 +1,65 @@
+# app/api/internal.py
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_principal, oauth2_scheme, resolve_principal
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.core.request_metrics import request_metrics
+from app.db.session import get_async_db
+from app.db.pool_metrics import get_pool_stats, render_pool_metrics
+from app.db.query_metrics import query_metrics
+from app.core.hashing import password_hasher
+from app.api.orders import order_view_cache
+from app.services.qr_service import qr_service
+from app.services.eta_service import eta_service
+
+router = APIRouter()
+
+def require_staff(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    if current_user.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+async def require_metrics_access(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # Scrapers present METRICS_TOKEN; people use their staff login
+    if settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    principal = await resolve_principal(token, db)
+    if principal.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+@router.get("/db-pool")
+def db_pool_stats(current_user: Principal = Depends(require_staff)):
+    """Live connection-pool gauges, counters and checkout-wait histograms."""
+    return get_pool_stats()
+
+@router.get("/hashing")
+def hashing_stats(current_user: Principal = Depends(require_staff)):
+    """Password-hashing pool load, rejections (503s) and per-operation latency."""
+    return password_hasher.stats()
+
+@router.get("/http-cache")
+def http_cache_stats(current_user: Principal = Depends(require_staff)):
+    """Sizes and hit rates of the in-memory response caches."""
+    return {"qr_images": qr_service.cache.stats(), "order_views": order_view_cache.stats()}
+
+@router.get("/eta")
+def eta_stats(current_user: Principal = Depends(require_staff)):
+    """Per-service, per-stage duration samples and quantiles behind the ETAs."""
+    return eta_service.stats()
+
+@router.get("/admission")
+def admission_stats(current_user: Principal = Depends(require_staff)):
+    """Per route class: limits, in-flight and queued requests, sheds (503s) and queue waits."""
+    return admission.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+def prometheus_metrics():
+    """Per-route request, admission, SQL and pool metrics in the Prometheus text format."""
+    lines = request_metrics.render() + admission.render() + query_metrics.render() + render_pool_metrics()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -1,97 +1,297 @@
 # app/api/orders.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-
-from app.db.session import get_db
-from app.db.models import User, Order, OrderItem
-from app.api.deps import get_current_user
-from app.schemas import OrderResponse, OrderCreate, OrderItemResponse, StatusUpdate, SERVICE_WORKFLOWS
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db
+from app.db.models import User, Order
+from app.api.deps import get_current_principal
+from app.core.principal_cache import Principal
+from app.core.config import settings
+from app.core.http_cache import BodyCache, CachedBody, cached_response, etag_matches, not_modified
+from app.schemas import (
+    OrderResponse, OrderCreate, OrderItemResponse, StatusUpdate, LabelSheetRequest,
+    BatchStatusUpdate, ItemStatusResult, ItemStatusTransitionResponse
+)
 from app.services.order_service import order_service
-from app.repositories.order_repo import order_repo
+from app.repositories.order_repo import as_utc, order_repo
+from app.repositories.history_repo import history_repo
+from app.services.workflow_engine import workflow_engine
+from app.services.qr_service import qr_service
+from app.services.label_service import label_service
+from app.services.export_service import export_service
+from app.services.eta_service import eta_service
 
 router = APIRouter()
 
+# Serialized GET /orders/qr/{id} bodies, keyed by ETag (so by order version)
+order_view_cache = BodyCache(settings.ORDER_VIEW_CACHE_MAX_BYTES)
+# Orders change: clients may store them but must revalidate every time
+ORDER_CACHE_CONTROL = "no-cache"
+
 # --- Helper Function (Copied logic from your main.py) ---
 def enrich_order_response(order: Order) -> Order:
-    """Adds frontend-specific fields like qr_code_url and possible statuses."""
-    if order.qr_code_path:
-        order.qr_code_url = f"/qr_codes/{order.qr_code_path}"
+    """Adds frontend-specific fields like qr_code_url, possible statuses and ETAs."""
+    order.qr_code_url = qr_service.order_qr_url(order.id)
         
     for item in order.items:
-        workflow = SERVICE_WORKFLOWS.get(item.service_name, [])
-        try:
-            current_index = workflow.index(item.status)
-            item.possible_next_statuses = workflow[current_index + 1:]
-        except (ValueError, IndexError):
-            item.possible_next_statuses = []
+        item.possible_next_statuses = workflow_engine.next_statuses(item.service_name, item.status)
+        item.estimated_ready_at = eta_service.estimate_item(item.service_name, item.status, item.status_changed_at)
+    order.estimated_ready_at = eta_service.estimate_order(
+        (item.service_name, item.status, item.status_changed_at) for item in order.items
+    )
     return order
 
+def encode_order_rows(order_rows, item_rows) -> bytes:
+    """
+    Projection fast path: List[OrderResponse] as JSON bytes, built straight
+    from order_repo row tuples (no ORM objects, no Pydantic validation).
+    Field names and order mirror OrderResponse / OrderItemResponse.
+    """
+    next_statuses = workflow_engine.next_statuses
+    estimate_item = eta_service.estimate_item
+    items_by_order, stages_by_order = {}, {}
+    for order_id, item_id, service_name, quantity, cost, status, status_changed_at in item_rows:
+        items_by_order.setdefault(order_id, []).append({
+            "id": item_id,
+            "service_name": service_name,
+            "quantity": quantity,
+            "cost": float(cost),
+            "status": status,
+            "possible_next_statuses": next_statuses(service_name, status),
+            "estimated_ready_at": estimate_item(service_name, status, status_changed_at),
+        })
+        stages_by_order.setdefault(order_id, []).append((service_name, status, status_changed_at))
+    return orjson.dumps([
+        {
+            "id": order_id,
+            "owner_id": owner_id,
+            "created_at": created_at,
+            "total_cost": float(total_cost),
+            "payment_status": payment_status,
+            "is_covered_by_plan": is_covered_by_plan,
+            "active_item_count": active_item_count,
+            "estimated_ready_at": eta_service.estimate_order(stages_by_order.get(order_id, ())),
+            "qr_code_url": qr_service.order_qr_url(order_id),
+            "items": items_by_order.get(order_id, []),
+        }
+        for order_id, owner_id, created_at, total_cost, payment_status, is_covered_by_plan, active_item_count in order_rows
+    ], option=orjson.OPT_UTC_Z)
+
 @router.post("/", response_model=OrderResponse)
-def create_order(
+async def create_order(
     order_in: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    owner = db.query(User).filter(User.username == order_in.customer_username).first()
+    result = await db.execute(select(User).where(User.username == order_in.customer_username))
+    owner = result.scalars().first()
     if not owner:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    new_order = order_service.create_order(db, order_in, owner)
+    new_order = await order_service.create_order_async(db, order_in, owner, current_user.id)
     
     # Generate QR (Service layer handles this internally or we call util here)
     # Assuming service.create_order handles it, otherwise call your util here
     
     return enrich_order_response(new_order)
 
+DEFAULT_PAGE_SIZE = 100
+
 @router.get("/", response_model=List[OrderResponse])
-def list_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def list_orders(
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
+    """
+    Keyset-paginated order listing (newest first).
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    # Customers only ever see their own orders; staff see all, optionally filtered
     if current_user.role == "customer":
-        orders = order_repo.get_by_owner(db, current_user.id)
+        owner_id = current_user.id
+    try:
+        orders, items, next_cursor = await order_repo.list_page_rows_async(
+            db,
+            owner_id=owner_id,
+            status=status,
+            payment_status=payment_status,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    # Served through the projection fast path; response_model documents the shape
+    return Response(content=encode_order_rows(orders, items), media_type="application/json", headers=headers)
+
+@router.get("/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Full order history for finance, streamed (constant memory):
+    NDJSON with one order per line, or CSV with one line per item.
+    created_from is inclusive, created_to exclusive; status matches any item.
+    """
+    if current_user.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    filters = dict(created_from=created_from, created_to=created_to, status=status, payment_status=payment_status)
+    filename = f"orders-{datetime.now(timezone.utc):%Y%m%d}.{format}"
+    if format == "csv":
+        body, media_type = export_service.stream_csv(**filters), "text/csv"
     else:
-        # Admin sees all
-        orders = db.query(Order).order_by(Order.created_at.desc()).all()
-        
-    return [enrich_order_response(o) for o in orders]
+        body, media_type = export_service.stream_ndjson(**filters), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/labels")
+async def print_labels(
+    request: LabelSheetRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Printable QR label sheets for many orders at once (counter drop-off rush),
+    streamed as a multi-page PDF or a ZIP of PNG pages.
+    """
+    if current_user.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not request.order_ids and not request.created_since:
+        raise HTTPException(status_code=400, detail="Provide order_ids or created_since")
+
+    stmt = select(Order.id)
+    if request.order_ids:
+        stmt = stmt.where(Order.id.in_(request.order_ids))
+    if request.created_since:
+        stmt = stmt.where(Order.created_at >= as_utc(request.created_since))
+    stmt = stmt.order_by(Order.created_at, Order.id).limit(settings.LABEL_MAX_ORDERS + 1)
+    order_ids = list((await db.execute(stmt)).scalars().all())
+
+    if not order_ids:
+        raise HTTPException(status_code=404, detail="No matching orders")
+    if len(order_ids) > settings.LABEL_MAX_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.LABEL_MAX_ORDERS} orders per request")
+    if request.order_ids:
+        # Keep the caller's order (e.g. the order bags are lined up at the counter)
+        position = {order_id: i for i, order_id in enumerate(request.order_ids)}
+        order_ids.sort(key=position.__getitem__)
+
+    if request.format == "png":
+        return StreamingResponse(
+            label_service.stream_png_zip(order_ids),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="order-labels.zip"'},
+        )
+    return StreamingResponse(
+        label_service.stream_pdf(order_ids),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="order-labels.pdf"'},
+    )
+
+def order_etag(order_id: str, version: int, stages: list[tuple[str, str]]) -> str:
+    # The body depends only on the order row/items (version), the workflows
+    # and the stage durations behind its items' ETAs; all of them are the
+    # same on every worker
+    return f'"order-{order_id}-{version}-{workflow_engine.fingerprint}-{eta_service.stages_fingerprint(stages)}"'
 
 @router.get("/qr/{order_id}", response_model=OrderResponse)
-def get_order_by_qr(
+async def get_order_by_qr(
+    request: Request,
     order_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    order = order_repo.get_by_id(db, order_id)
-    if not order:
+    """
+    Hit repeatedly by scanners. Unchanged orders cost one indexed lookup of
+    the version and item stages: 304 if the client has it, else the cached
+    serialized body.
+    """
+    current = await order_repo.get_version_stages_async(db, order_id)
+    if current is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return enrich_order_response(order)
+    etag = order_etag(order_id, *current)
+    if etag_matches(request, etag):
+        return not_modified(etag, ORDER_CACHE_CONTROL)
+
+    body = order_view_cache.get(etag)
+    if body is None:
+        order = await order_repo.get_by_id_async(db, order_id)
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        content = OrderResponse.model_validate(enrich_order_response(order)).model_dump_json().encode()
+        # Tag what was actually loaded; the version may have moved on meanwhile
+        stages = [(item.service_name, item.status) for item in order.items]
+        body = CachedBody(content, order_etag(order.id, order.version, stages))
+        order_view_cache.put(body.etag, body)
+    return cached_response(request, body, ORDER_CACHE_CONTROL)
 
 @router.put("/{order_id}/pay", response_model=OrderResponse)
-def pay_order(
+async def pay_order(
     order_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     # Logic moved to service, passing IDs for validation
-    order = order_service.process_payment(db, order_id, current_user.id)
+    order = await order_service.process_payment_async(db, order_id, current_user.id)
     return enrich_order_response(order)
 
 @router.put("/items/{item_id}/status", response_model=OrderItemResponse)
-def update_status(
+async def update_status(
     item_id: str,
     status_update: StatusUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    updated_item = order_service.update_item_status(db, item_id, status_update.status)
+    updated_item = await order_service.update_item_status_async(db, item_id, status_update.status, current_user.id)
     
-    # We need to re-enrich the item (specifically for possible_next_statuses)
-    # A quick way is to fetch the parent order and find the item
-    return enrich_order_response(updated_item.order).items[0] # Simplified logic
\ No newline at end of file
+    # Enriched through the parent order (possible_next_statuses, ETA)
+    order = enrich_order_response(updated_item.order)
+    return next(item for item in order.items if item.id == item_id)
+
+@router.put("/items/status", response_model=List[ItemStatusResult])
+async def update_statuses(
+    batch: BatchStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Moves a whole cart of scanned items at once. Every transition is validated;
+    the valid ones are applied together and reported per item.
+    """
+    if current_user.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return await order_service.update_item_statuses_async(db, batch.updates, current_user.id)
+
+@router.get("/items/{item_id}/history", response_model=List[ItemStatusTransitionResponse])
+async def item_status_history(
+    item_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Every status change of the item, oldest first, with who made it."""
+    if current_user.role != "serviceman":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await history_repo.get_item_history_async(db, item_id)
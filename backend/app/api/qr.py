@@ -0,0 +1,36 @@
+# app/api/qr.py
+import uuid
+
+from fastapi import APIRouter, HTTPException, Path, Request, Response
+
+from app.core.http_cache import cached_response
+from app.services.qr_service import QRImage, qr_service
+
+router = APIRouter()
+
+FORMAT = Path(..., pattern="^(png|svg)$")
+
+def _qr_response(request: Request, image: QRImage) -> Response:
+    # The URL fully determines the image, so clients may keep it forever
+    return cached_response(request, image, "public, max-age=31536000, immutable")
+
+def _entity_id(value: str) -> str:
+    """
+    Order and user ids are UUIDs; anything else cannot exist, so it is a 404
+    rather than an image (and never takes a slot in the QR cache). Returns
+    the canonical form, so spellings of one id share a cache entry.
+    """
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+
+@router.get("/orders/{order_id}.{fmt}")
+async def order_qr(request: Request, order_id: str, fmt: str = FORMAT):
+    """QR code encoding {"order_id": ...}, as scanned at the counter."""
+    return _qr_response(request, await qr_service.get({"order_id": _entity_id(order_id)}, fmt))
+
+@router.get("/users/{user_id}.{fmt}")
+async def user_qr(request: Request, user_id: str, fmt: str = FORMAT):
+    """A customer's static QR code, encoding {"user_id": ...}."""
+    return _qr_response(request, await qr_service.get({"user_id": _entity_id(user_id)}, fmt))
@@ -0,0 +1,60 @@
+# app/api/reports.py
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.internal import require_staff
+from app.core.config import settings
+from app.core.principal_cache import Principal
+from app.db.session import get_async_db
+from app.repositories.rollup_repo import rollup_repo
+from app.schemas import DailyServiceRollupResponse, ReportSummary, ServiceRollup
+
+router = APIRouter()
+
+# Everything here reads daily_service_rollups only, so a report costs the
+# same whatever the size of the order history.
+
+def _date_range(date_from: Optional[date], date_to: Optional[date]) -> tuple[date, date]:
+    """Inclusive UTC day range; defaults to the last REPORTS_DEFAULT_DAYS days."""
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=settings.REPORTS_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    if (date_to - date_from).days >= settings.REPORTS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Reports cover at most {settings.REPORTS_MAX_DAYS} days")
+    return date_from, date_to
+
+@router.get("/daily", response_model=List[DailyServiceRollupResponse])
+async def daily_report(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    service_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_staff)
+):
+    """Revenue and throughput per day and service (days without activity are omitted)."""
+    date_from, date_to = _date_range(date_from, date_to)
+    return await rollup_repo.get_daily_async(db, date_from, date_to, service_name)
+
+@router.get("/summary", response_model=ReportSummary)
+async def summary_report(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(require_staff)
+):
+    """Totals per service over the range, plus overall totals."""
+    date_from, date_to = _date_range(date_from, date_to)
+    services = [ServiceRollup.model_validate(row) for row in await rollup_repo.get_totals_async(db, date_from, date_to)]
+    return ReportSummary(
+        date_from=date_from,
+        date_to=date_to,
+        services=services,
+        billed=sum(s.billed for s in services),
+        paid_revenue=sum(s.paid_revenue for s in services),
+        items_ordered=sum(s.items_ordered for s in services),
+        items_completed=sum(s.items_completed for s in services),
+    )
@@ -1,36 +1,43 @@
 # app/api/users.py
 from typing import List, Dict
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.db.models import User, Order
-from app.api.deps import get_current_user
-from app.schemas import UserResponse, UserCreate, SubscriptionCreate, PasswordChange, OrderResponse
+from app.db.session import get_async_db
+from app.db.models import User, Order, ServiceUsage
+from app.api.deps import get_current_user, get_current_principal
+from app.core.principal_cache import Principal, principal_cache
+from app.schemas import UserResponse, SubscriptionCreate, PasswordChange, OrderResponse
 from app.services.user_service import user_service
-from app.core.security import verify_password, get_password_hash
+from app.repositories.order_repo import order_repo
+from app.repositories.usage_repo import usage_repo
+from app.core.hashing import password_hasher
 from app.api.orders import enrich_order_response # We will define this helper below
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UserResponse])
-def list_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def list_users(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(User).all()
+    result = await db.execute(select(User))
+    users = result.scalars().all()
+    await usage_repo.load_usage_async(db, users)
+    return users
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: Principal = Depends(get_current_principal)):
     return current_user
 
 @router.delete("/{user_id}")
-def remove_user(
+async def remove_user(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -38,74 +45,72 @@ def remove_user(
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
     # Simple delete logic (Service layer could handle cascade logic if complex)
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Manual cascade for safety (though DB cascade usually handles this)
-    db.query(Order).filter(Order.owner_id == user_id).delete()
-    db.delete(user)
-    db.commit()
+    await db.execute(delete(Order).where(Order.owner_id == user_id))
+    await db.execute(delete(ServiceUsage).where(ServiceUsage.user_id == user_id))
+    await db.delete(user)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
     return {"message": "User deleted"}
 
 @router.get("/me/qrcodes", response_model=Dict[str, str])
-def get_my_qr(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    filename = user_service.get_or_create_qr(db, current_user)
-    return {"user_qr": f"/qr_codes/{filename}"}
+async def get_my_qr(current_user: Principal = Depends(get_current_principal)):
+    return {"user_qr": user_service.get_or_create_qr(current_user)}
 
 # --- Subscriptions ---
 @router.post("/{user_id}/subscribe", response_model=UserResponse)
-def subscribe_user(
+async def subscribe_user(
     user_id: str,
     sub_in: SubscriptionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    return user_service.handle_subscription(db, user, sub_in.plan)
+    return await user_service.handle_subscription_async(db, user, sub_in.plan)
 
 @router.put("/me/subscribe", response_model=UserResponse)
-def self_subscribe(
+async def self_subscribe(
     sub_in: SubscriptionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return user_service.handle_subscription(db, current_user, sub_in.plan)
+    return await user_service.handle_subscription_async(db, current_user, sub_in.plan)
 
 # --- Password Change ---
 @router.put("/me/password")
-def change_password(
+async def change_password(
     pwd_in: PasswordChange,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not current_user.password or not verify_password(pwd_in.current_password, current_user.password):
+    # bcrypt is CPU-bound; it runs in password_hasher's process pool
+    if not current_user.password or not await password_hasher.verify(pwd_in.current_password, current_user.password):
         raise HTTPException(status_code=400, detail="Incorrect current password")
     
-    current_user.password = get_password_hash(pwd_in.new_password)
-    db.commit()
+    current_user.password = await password_hasher.hash(pwd_in.new_password)
+    await db.commit()
+    principal_cache.invalidate_user(current_user.id)
     return {"message": "Password updated"}
 
 @router.get("/{user_id}/active-orders", response_model=List[OrderResponse])
-def get_user_active_orders(
+async def get_user_active_orders(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     if current_user.role != "serviceman":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    orders = db.query(Order).filter(Order.owner_id == user_id).all()
-    # Filter for active items logic
-    active_orders = [o for o in orders if any(i.status != "picked_up" for i in o.items)]
-    
+    # Only orders with items not yet picked up (see Order.active_item_count)
+    active_orders = await order_repo.get_active_by_owner_async(db, user_id)
     return [enrich_order_response(o) for o in active_orders]
\ No newline at end of file
@@ -0,0 +1,177 @@
+# app/core/admission.py
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import Histogram, prometheus_histogram, prometheus_metric
+
+DEFAULT_CLASS = "api"
+# Exact routes by method and whole path, checked before the prefixes: scanner
+# status updates share /orders/ with everything else
+ROUTE_PATTERNS = (
+    ("PUT", re.compile(r"/orders/items/status"), "scan"),
+    ("PUT", re.compile(r"/orders/items/[^/]+/status"), "scan"),
+)
+# First matching path prefix wins; unmatched paths fall into DEFAULT_CLASS
+ROUTE_CLASSES = (
+    ("/orders/qr/", "scan"),
+    ("/qr/", "scan"),
+    ("/qr_codes/", "scan"),
+    ("/auth/", "auth"),
+    ("/reports/", "reporting"),
+    ("/orders/export", "reporting"),
+    ("/orders/labels", "reporting"),
+    ("/internal/", "admin"),
+    ("/users/me", DEFAULT_CLASS),
+    ("/users/", "admin"),
+)
+# Never queued or shed: long-lived live-update streams, and metrics scrapes
+# (which matter most exactly when everything else is being shed)
+EXEMPT_PREFIXES = ("/events/", "/internal/metrics")
+
+class AdmissionClass:
+    """
+    A FIFO admission queue for one class of routes: at most `max_in_flight`
+    requests run, at most `max_queue` wait (each for up to `queue_timeout`
+    seconds), and everyone else is shed straight away.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+        self.queue_wait = Histogram()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """True once the request may run; False if it was shed."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed["queue_full"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            # release() hands its slot straight to the waiter (in_flight unchanged)
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed["queue_timeout"] += 1
+            return False
+        except asyncio.CancelledError:
+            # Client went away; pass on a slot that was handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            self.queue_wait.observe(time.perf_counter() - start)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
+
+class AdmissionController:
+    """The route classes and their limits (one set per worker process)."""
+
+    def __init__(self, limits: Dict[str, List[float]]):
+        self.classes = {
+            name: AdmissionClass(name, int(max_in_flight), int(max_queue), float(queue_timeout))
+            for name, (max_in_flight, max_queue, queue_timeout) in limits.items()
+        }
+
+    def classify(self, method: str, path: str) -> Optional[AdmissionClass]:
+        """None for exempt paths (and for classes without configured limits)."""
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        for route_method, pattern, name in ROUTE_PATTERNS:
+            if method == route_method and pattern.fullmatch(path):
+                return self.classes.get(name)
+        for prefix, name in ROUTE_CLASSES:
+            if path.startswith(prefix):
+                return self.classes.get(name)
+        return self.classes.get(DEFAULT_CLASS)
+
+    def stats(self) -> dict:
+        return {name: admission_class.stats() for name, admission_class in self.classes.items()}
+
+    def render(self) -> List[str]:
+        classes = list(self.classes.values())
+        lines = prometheus_metric("washwise_admission_in_flight", "gauge", "Admitted requests running, per route class.", [({"class": c.name}, c.in_flight) for c in classes])
+        lines += prometheus_metric("washwise_admission_queue_depth", "gauge", "Requests waiting for admission, per route class.", [({"class": c.name}, c.queue_depth) for c in classes])
+        lines += prometheus_metric("washwise_admission_admitted_total", "counter", "Requests admitted, per route class.", [({"class": c.name}, c.admitted) for c in classes])
+        lines += prometheus_metric(
+            "washwise_admission_shed_total", "counter", "Requests answered 503 without running, per route class and reason.",
+            [({"class": c.name, "reason": reason}, count) for c in classes for reason, count in c.shed.items()],
+        )
+        lines += prometheus_histogram("washwise_admission_queue_wait_seconds", "Time queued requests waited for admission.", [({"class": c.name}, c.queue_wait.snapshot()) for c in classes])
+        return lines
+
+admission = AdmissionController(settings.ADMISSION_LIMITS)
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware: a request holds its class's slot until its last body
+    byte is sent, so slow streams count against their own class only.
+    Requests over the limit get a fast 503 with Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        admission_class = self.controller.classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if admission_class is None:
+            return await self.app(scope, receive, send)
+
+        if not await admission_class.acquire():
+            response = JSONResponse(
+                {"detail": "Server busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_class.release()
@@ -1,7 +1,7 @@
 # app/core/config.py
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Calculate absolute path to .env file
 current_file_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,6 +16,13 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
+    # Verified-token cache used by get_current_principal (per process)
+    PRINCIPAL_CACHE_TTL: float = 60.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    # bcrypt runs in its own process pool, independent of the request threadpool
+    HASH_WORKERS: int = 2
+    HASH_QUEUE_SIZE: int = 32         # waiting jobs beyond HASH_WORKERS before answering 503
+    HASH_RETRY_AFTER: int = 1         # seconds, sent with the 503
     
     # --- Environment & Frontend ---
     # These were missing and causing the "Extra inputs" error
@@ -23,12 +30,78 @@ class Settings(BaseSettings):
     FRONTEND_URL: str = "http://localhost:5173"
     
     # --- Database ---
-    DB_USER: str
-    DB_PASSWORD: str
-    DB_HOST: str
-    DB_PORT: str
-    DB_NAME: str
+    # DATABASE_URL takes precedence over the DB_* parts when set
+    # (e.g. "sqlite:///./washwise.db" for local testing)
+    DATABASE_URL: Optional[str] = None
+    DB_USER: Optional[str] = None
+    DB_PASSWORD: Optional[str] = None
+    DB_HOST: Optional[str] = None
+    DB_PORT: Optional[str] = None
+    DB_NAME: Optional[str] = None
     DB_ECHO: bool = False
+    SCHEMA_CHECK_ON_STARTUP: bool = True   # refuse to start on an unsupported database or one behind the migrations
+
+    # --- Connection Pool (applied to both the sync and async engines) ---
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0     # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800       # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True     # test connections on checkout (drops stale ones)
+
+    # --- Order Workflows ---
+    # True: an item may jump ahead to any later stage; False: one stage at a time
+    WORKFLOW_ALLOW_SKIP: bool = True
+
+    # --- QR Codes ---
+    QR_CACHE_MAX_BYTES: int = 16 * 1024 * 1024   # rendered images kept in memory
+    LABEL_WORKERS: int = 2                       # processes rendering bulk label sheets
+    LABEL_MAX_ORDERS: int = 2000                 # per label-sheet request
+
+    # --- HTTP Caching ---
+    ORDER_VIEW_CACHE_MAX_BYTES: int = 8 * 1024 * 1024   # serialized GET /orders/qr bodies
+    SYSTEM_CONFIG_MAX_AGE: int = 300                     # seconds browsers may reuse /system/config
+
+    # --- Exports ---
+    EXPORT_BATCH_SIZE: int = 1000        # rows fetched (and encoded) per round trip
+
+    # --- Reports ---
+    REPORTS_DEFAULT_DAYS: int = 30       # range when none is given
+    REPORTS_MAX_DAYS: int = 366          # longest range one request may cover
+
+    # --- Stage Durations & ETAs ---
+    ETA_ENABLED: bool = True             # run the background stage-duration aggregator
+    ETA_POLL_INTERVAL: float = 30.0      # seconds between reads of new status transitions
+    ETA_BATCH_SIZE: int = 5000           # transitions read per query
+    ETA_WINDOW_DAYS: int = 30            # history loaded at startup
+    ETA_GAP_SECONDS: float = 600.0       # how long ids skipped in the log are re-checked (late commits)
+    ETA_QUANTILE: float = 0.5            # stage duration used for estimates (0.5 = median)
+    ETA_MIN_SAMPLES: int = 5             # per service and stage before it is trusted
+
+    # --- Metrics ---
+    METRICS_ENABLED: bool = True         # per-request timing and SQL metrics (query budgets work either way)
+    METRICS_TOKEN: Optional[str] = None  # bearer token for scrapers on /internal/metrics (staff tokens always work)
+    SLOW_REQUEST_SECONDS: float = 1.0    # requests slower than this are logged with their SQL
+    SLOW_REQUEST_MAX_STATEMENTS: int = 50  # statements kept per request for that log
+
+    # --- Admission Control (per route class, see app/core/admission.py) ---
+    ADMISSION_ENABLED: bool = True
+    # class: [max in flight, max queued, seconds a request may wait in the queue]
+    ADMISSION_LIMITS: Dict[str, List[float]] = {
+        "scan": [64, 256, 0.5],          # counter scanners: many, cheap, must never stall
+        "auth": [16, 64, 2.0],           # login/register (bcrypt)
+        "admin": [8, 32, 5.0],           # staff user management and internal stats
+        "reporting": [4, 8, 10.0],       # reports, exports, label sheets
+        "api": [48, 128, 2.0],           # everything else
+    }
+    ADMISSION_RETRY_AFTER: int = 1       # seconds, sent with the 503
+
+    # --- Live Updates (WebSocket / SSE) ---
+    EVENTS_BACKEND: str = "local"        # "local" (single process) or "postgres" (LISTEN/NOTIFY)
+    EVENTS_PG_CHANNEL: str = "washwise_events"
+    EVENTS_QUEUE_SIZE: int = 100         # buffered messages per client before a resync
+    EVENTS_HEARTBEAT: float = 15.0       # seconds between keep-alives on idle streams
+    EVENTS_RECONNECT_BASE: float = 1.0   # first retry delay after the LISTEN connection drops (then doubled)
+    EVENTS_RECONNECT_MAX: float = 30.0   # cap on that delay
 
     # --- CORS ---
     ALLOWED_ORIGINS: List[str] = ["http://localhost:5173"]
@@ -36,6 +109,19 @@ class Settings(BaseSettings):
     # --- External Services (Google & Mailgun) ---
     MAILGUN_API_KEY: Optional[str] = None
     MAILGUN_DOMAIN: Optional[str] = None
+    # Point at tools/fake_mailgun.py (e.g. http://127.0.0.1:8025/v3) for local testing
+    MAILGUN_API_BASE: str = "https://api.mailgun.net/v3"
+
+    # --- Notification Outbox Worker ---
+    NOTIFY_WORKER_ENABLED: bool = True
+    NOTIFY_BATCH_SIZE: int = 50
+    NOTIFY_CONCURRENCY: int = 8          # parallel Mailgun requests (and pooled connections)
+    NOTIFY_POLL_INTERVAL: float = 2.0    # seconds between polls when the outbox is empty
+    NOTIFY_HTTP_TIMEOUT: float = 10.0
+    NOTIFY_MAX_ATTEMPTS: int = 6         # then the message is dead-lettered
+    NOTIFY_BACKOFF_BASE: float = 5.0     # seconds; doubles with every failed attempt
+    NOTIFY_BACKOFF_MAX: float = 900.0
+    NOTIFY_CLAIM_LEASE: float = 60.0     # seconds a claimed batch stays invisible to other workers
     
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
@@ -45,8 +131,19 @@ class Settings(BaseSettings):
 
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+        """Same database as SQLALCHEMY_DATABASE_URI, but through an async driver."""
+        uri = self.SQLALCHEMY_DATABASE_URI
+        scheme, rest = uri.split("://", 1)
+        dialect = scheme.split("+", 1)[0]
+        async_drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+        return f"{async_drivers.get(dialect, scheme)}://{rest}"
+
     # Configuration to read from .env
     model_config = SettingsConfigDict(
         env_file=ENV_PATH,
@@ -0,0 +1,244 @@
+# app/core/events.py
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, dict], None]
+Resync = Callable[[], None]
+
+# --- Channels ---
+STAFF_CHANNEL = "staff"
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+class Subscription:
+    """One connected client. Bounded: a client that stops reading gets a resync."""
+
+    def __init__(self, bus: "EventBus", channels: Set[str], max_size: int):
+        self.bus = bus
+        self.channels = channels
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+
+    def _offer(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Dropping deltas silently would leave the client wrong; tell it to refetch
+            self._resync()
+
+    def _resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next message, or None if nothing arrived within `timeout`."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+# --- Fan-out Backends ---
+class LocalBackend:
+    """Single process: publish goes straight to this process's subscribers."""
+
+    async def start(self, deliver: Deliver, resync: Resync):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+
+class PostgresBackend:
+    """
+    Cross-worker fan-out via LISTEN/NOTIFY: every worker listens on one
+    Postgres channel and delivers what it hears (including its own NOTIFYs)
+    to its local subscribers. NOTIFYs go out over a separate connection,
+    one at a time (an asyncpg connection runs one operation at a time, and
+    the listening one must stay free to receive). A dropped LISTEN connection
+    is re-established with backoff; whatever was NOTIFYed in between is lost,
+    so every local client is then told to resync.
+    """
+
+    def __init__(self, dsn: str, pg_channel: str, reconnect_base: float, reconnect_max: float):
+        self.dsn = dsn
+        self.pg_channel = pg_channel
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver, resync: Resync):
+        import asyncpg
+
+        self._deliver = deliver
+        self._resync = resync
+        # The first connections fail startup (bad DSN, no database); later drops are retried
+        self._listen_conn = await self._listen()
+        self._publish_conn = await asyncpg.connect(self.dsn)
+        self._watcher = asyncio.create_task(self._keep_listening())
+
+    def _on_notify(self, connection, pid, pg_channel, payload):
+        envelope = json.loads(payload)
+        self._deliver(envelope["channel"], envelope["message"])
+
+    async def _listen(self):
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.pg_channel, self._on_notify)
+        return conn
+
+    async def _keep_listening(self):
+        while True:
+            lost = asyncio.Event()
+            self._listen_conn.add_termination_listener(lambda conn: lost.set())
+            if not self._listen_conn.is_closed():
+                await lost.wait()
+            logger.warning("Lost the LISTEN connection on %s, reconnecting", self.pg_channel)
+            self._listen_conn = await self._relisten()
+            logger.info("Listening on %s again", self.pg_channel)
+            self._resync()
+
+    async def _relisten(self):
+        delay = self.reconnect_base
+        while True:
+            try:
+                return await self._listen()
+            except Exception as exc:
+                logger.error("Could not re-establish LISTEN on %s: %s (retrying in %.1fs)", self.pg_channel, exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max)
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+        async with self._publish_lock:
+            for conn in (self._publish_conn, self._listen_conn):
+                if conn is not None:
+                    await conn.close()
+            self._listen_conn = self._publish_conn = None
+
+    async def publish(self, channel: str, message: dict):
+        import asyncpg
+
+        payload = json.dumps({"channel": channel, "message": message}, default=str)
+        async with self._publish_lock:
+            if self._publish_conn is None:
+                return  # stopped
+            # Reconnect after a dropped connection (e.g. a database restart)
+            if self._publish_conn.is_closed():
+                self._publish_conn = await asyncpg.connect(self.dsn)
+            await self._publish_conn.execute("SELECT pg_notify($1, $2)", self.pg_channel, payload)
+
+class EventBus:
+    """
+    In-process pub/sub for live order updates (WebSocket / SSE clients).
+    publish() is safe to call from any thread; delivery always happens on the
+    event loop the bus was started on.
+    """
+
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[asyncio.Future] = set()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start(self._deliver, self._resync_all)
+
+    async def stop(self):
+        await self.backend.stop()
+        self._loop = None
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = Subscription(self, set(channels), self.queue_size)
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for channel in subscription.channels:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channel: str, message: dict):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return  # not started (scripts, CLI): nobody can be listening
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            future = loop.create_task(self.backend.publish(channel, message))
+            self._pending.add(future)
+        else:
+            future = asyncio.run_coroutine_threadsafe(self.backend.publish(channel, message), loop)
+        future.add_done_callback(self._published)
+
+    def _published(self, future):
+        self._pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Failed to publish event: %s", future.exception())
+
+    def _deliver(self, channel: str, message: dict):
+        for subscription in tuple(self._subscribers.get(channel, ())):
+            subscription._offer(message)
+
+    def _resync_all(self):
+        for subscription in {s for subscribers in self._subscribers.values() for s in subscribers}:
+            subscription._resync()
+
+def _build_backend():
+    if settings.EVENTS_BACKEND == "postgres":
+        # asyncpg wants a plain postgresql:// DSN (no SQLAlchemy driver suffix)
+        scheme, rest = settings.SQLALCHEMY_DATABASE_URI.split("://", 1)
+        return PostgresBackend(
+            f"postgresql://{rest}", settings.EVENTS_PG_CHANNEL,
+            settings.EVENTS_RECONNECT_BASE, settings.EVENTS_RECONNECT_MAX,
+        )
+    return LocalBackend()
+
+event_bus = EventBus(_build_backend(), settings.EVENTS_QUEUE_SIZE)
+
+# --- Publish on Commit ---
+# Services queue events on the session; they go out only once the
+# transaction commits, and are dropped if it rolls back.
+def queue_event(db, channel: str, message: dict):
+    db.info.setdefault("pending_events", []).append((channel, message))
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session: Session):
+    for channel, message in session.info.pop("pending_events", ()):
+        event_bus.publish(channel, message)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session: Session):
+    session.info.pop("pending_events", None)
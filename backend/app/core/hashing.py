@@ -0,0 +1,78 @@
+# app/core/hashing.py
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core import security
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so a login burst can't starve the
+    request threadpool or the event loop. At most `workers + queue_size` jobs
+    are admitted; beyond that callers get an immediate 503 with Retry-After.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self.rejected = 0
+        self.latency = {"hash": Histogram(), "verify": Histogram()}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app never forks. Workers come from
+        # a forkserver: forking the running server would copy its event loop,
+        # threads and open connections (held locks included) into every child.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver"))
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, please retry",
+                headers={"Retry-After": str(settings.HASH_RETRY_AFTER)},
+            )
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._in_flight -= 1
+            self.latency[operation].observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", security.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", security.verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Returns (valid, new_hash); new_hash is set when the stored hash needs an upgrade."""
+        return await self._run("verify", security.verify_and_update_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "latency_seconds": {op: h.snapshot() for op, h in self.latency.items()},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(settings.HASH_WORKERS, settings.HASH_QUEUE_SIZE)
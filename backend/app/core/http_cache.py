@@ -0,0 +1,78 @@
+# app/core/http_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request, Response
+
+@dataclass(frozen=True)
+class CachedBody:
+    """A response body serialized once, with its strong ETag."""
+    content: bytes
+    etag: str
+    media_type: str = "application/json"
+
+def strong_etag(content: bytes) -> str:
+    # Derived from the exact bytes served
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+def json_body(data) -> CachedBody:
+    content = json.dumps(data, separators=(",", ":")).encode()
+    return CachedBody(content, strong_etag(content))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def cached_response(request: Request, body: CachedBody, cache_control: str) -> Response:
+    """The pre-serialized body, or 304 Not Modified if the client already has it."""
+    if etag_matches(request, body.etag):
+        return not_modified(body.etag, cache_control)
+    return Response(
+        content=body.content,
+        media_type=body.media_type,
+        headers={"ETag": body.etag, "Cache-Control": cache_control},
+    )
+
+class BodyCache:
+    """LRU of serialized bodies, bounded by total bytes rather than entry count."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedBody] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: CachedBody):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.content)
+            self._entries[key] = body
+            self._size += len(body.content)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.content)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
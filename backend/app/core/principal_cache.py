@@ -0,0 +1,116 @@
+# app/core/principal_cache.py
+"""
+Per-process cache of authenticated principals. Invalidation (password
+changes, plan purchases, deleted users) only reaches the process it runs
+in: other workers keep serving their cached copy of that user for up to
+PRINCIPAL_CACHE_TTL seconds.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class Principal:
+    """Read-only snapshot of the authenticated user (fields of UserResponse)."""
+    id: str
+    username: str
+    role: str
+    email: str
+    membership_plan: str
+    membership_expiry_date: Optional[datetime] = None
+    monthly_services_used: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            role=user.role,
+            email=user.email,
+            membership_plan=user.membership_plan,
+            membership_expiry_date=user.membership_expiry_date,
+            monthly_services_used=dict(user.monthly_services_used or {}),
+        )
+
+class PrincipalCache:
+    """
+    Bounded LRU of verified tokens -> Principal. Entries expire after
+    PRINCIPAL_CACHE_TTL seconds or at the token's own `exp`, whichever is first.
+    Keys are SHA-256 digests, so raw tokens are never held in memory.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, Principal]] = OrderedDict()
+        self._by_user: Dict[str, Set[bytes]] = {}
+        # Bumped per user by invalidate_user; clear() bumps _base (which counts for everyone)
+        self._generations: Dict[str, int] = {}
+        self._base = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def generation(self, user_id: str) -> int:
+        """Call before loading a user's principal and pass the value to put()."""
+        with self._lock:
+            return self._generation(user_id)
+
+    def _generation(self, user_id: str) -> int:
+        # Both counters only grow, so the sum changes whenever either does
+        return self._base + self._generations.get(user_id, 0)
+
+    def put(self, token: str, principal: Principal, token_exp: float, generation: int):
+        key = self._key(token)
+        with self._lock:
+            # This user was invalidated while being loaded: the principal may be stale
+            if generation != self._generation(principal.id):
+                return
+            self._entries[key] = (min(time.time() + self.ttl, token_exp), principal)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._base += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key: bytes):
+        _, principal = self._entries.pop(key)
+        keys = self._by_user.get(principal.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[principal.id]
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
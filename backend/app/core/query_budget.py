@@ -0,0 +1,133 @@
+# app/core/query_budget.py
+"""
+Query budgets: catch N+1 regressions before production does.
+
+    with count_queries() as stats:            # any repository/service/endpoint call
+        await order_service.update_item_status_async(db, item_id, "started")
+    assert stats.queries <= 6
+
+    with query_budget(3, "get_order_by_qr"):  # raises QueryBudgetExceeded
+        ...
+
+    with strict_loading():                    # lazy loads raise instead of querying
+        ...
+
+Per-endpoint budgets are checked in at query_budgets.json and enforced on
+every request while endpoint_budgets is enabled (see
+tools/check_query_budgets.py and the pytest plugin in app/testing).
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, raiseload
+
+import app.db.query_metrics  # noqa: F401  (the hooks that do the counting)
+from app.core.request_metrics import RequestStats, current_request, request_observers
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "query_budgets.json")
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label: str, budget: int, stats: RequestStats):
+        statements = "\n".join(f"    {' '.join(statement.split())[:300]}" for statement, _ in stats.statements)
+        super().__init__(f"{label}: {stats.queries} queries, budget {budget}\n{statements}")
+        self.stats = stats
+
+# --- Counting ---
+@contextmanager
+def count_queries() -> Iterator[RequestStats]:
+    """Statements issued inside the block (they still count towards an enclosing request)."""
+    outer = current_request.get()
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request.reset(token)
+        if outer is not None:
+            stats.merge_into(outer)
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[RequestStats]:
+    with count_queries() as stats:
+        yield stats
+    if stats.queries > max_queries:
+        raise QueryBudgetExceeded(label, max_queries, stats)
+
+# --- Strict Loading ---
+def _raise_on_lazy_load(orm_execute_state):
+    # Eager options named by the query win over the wildcard, so only the
+    # relationships it did not load become errors when touched
+    if orm_execute_state.is_select and not orm_execute_state.is_column_load:
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*", sql_only=True))
+
+_strict_lock = threading.Lock()
+_strict_depth = 0
+
+@contextmanager
+def strict_loading():
+    """Every ORM query in the block (any session, sync or async) raises on lazy loads."""
+    global _strict_depth
+    with _strict_lock:
+        if _strict_depth == 0:
+            event.listen(Session, "do_orm_execute", _raise_on_lazy_load)
+        _strict_depth += 1
+    try:
+        yield
+    finally:
+        with _strict_lock:
+            _strict_depth -= 1
+            if _strict_depth == 0:
+                event.remove(Session, "do_orm_execute", _raise_on_lazy_load)
+
+# --- Per-Endpoint Budgets ---
+class EndpointBudgets:
+    """
+    Checked-in query budgets keyed by "METHOD /route/template". While enabled,
+    a request over its budget raises QueryBudgetExceeded (TestClient and
+    httpx.ASGITransport re-raise it in the caller); routes without a budget
+    are only recorded, so `observed` can seed the file.
+    """
+
+    def __init__(self, path: str = BUDGETS_PATH):
+        self.path = path
+        self.budgets: Dict[str, int] = {}
+        self.observed: Dict[str, int] = {}
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.budgets = json.load(f)
+
+    def enable(self):
+        self.load()
+        if not self.enabled:
+            request_observers.append(self.check)
+            self.enabled = True
+
+    def disable(self):
+        if self.enabled:
+            request_observers.remove(self.check)
+            self.enabled = False
+
+    def check(self, method: str, route: str, status: int, stats: RequestStats):
+        key = f"{method} {route}"
+        with self._lock:
+            self.observed[key] = max(self.observed.get(key, 0), stats.queries)
+        budget = self.budgets.get(key)
+        if budget is not None and stats.queries > budget:
+            raise QueryBudgetExceeded(key, budget, stats)
+
+    def save(self, path: Optional[str] = None):
+        """Writes the budgets with every observed route set to what it used."""
+        merged = {**self.budgets, **self.observed}
+        with open(path or self.path, "w") as f:
+            json.dump(dict(sorted(merged.items())), f, indent=2)
+            f.write("\n")
+
+endpoint_budgets = EndpointBudgets()
@@ -0,0 +1,166 @@
+# app/core/request_metrics.py
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Histogram, prometheus_histogram, prometheus_metric
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Requests that matched no API route (404s, static files): one label, bounded cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+class RequestStats:
+    """SQL issued while serving one request (filled in by app.db.query_metrics)."""
+    __slots__ = ("queries", "db_seconds", "statements", "dropped_statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: List[Tuple[str, float]] = []
+        self.dropped_statements = 0
+
+    def record_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self._keep(statement, seconds)
+
+    def _keep(self, statement: str, seconds: float):
+        # Kept for the slow-request log
+        if len(self.statements) < settings.SLOW_REQUEST_MAX_STATEMENTS:
+            self.statements.append((statement, seconds))
+        else:
+            self.dropped_statements += 1
+
+    def merge_into(self, outer: "RequestStats"):
+        """Adds these queries to an enclosing scope's stats."""
+        outer.queries += self.queries
+        outer.db_seconds += self.db_seconds
+        for statement, seconds in self.statements:
+            outer._keep(statement, seconds)
+        outer.dropped_statements += self.dropped_statements
+
+# The stats of the request being served in this task (None outside requests)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class RouteMetrics:
+    __slots__ = ("statuses", "latency", "response_size", "queries", "db_seconds")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram()
+        self.response_size = Histogram(RESPONSE_SIZE_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram()
+
+class RequestMetrics:
+    """Per (method, route template) request metrics, rendered for Prometheus."""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.response_size.observe(size)
+        metrics.queries.observe(stats.queries)
+        metrics.db_seconds.observe(stats.db_seconds)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            statuses = [(key, dict(metrics.statuses)) for key, metrics in routes]
+
+        def series(attribute: str):
+            return [({"method": m, "route": r}, getattr(metrics, attribute).snapshot()) for (m, r), metrics in routes]
+
+        lines = prometheus_metric(
+            "washwise_http_requests_total", "counter", "HTTP requests by route template and status code.",
+            [({"method": m, "route": r, "status": status}, count) for (m, r), counts in statuses for status, count in sorted(counts.items())],
+        )
+        lines += prometheus_metric("washwise_http_requests_in_flight", "gauge", "HTTP requests being served.", [({}, self.in_flight)])
+        lines += prometheus_histogram("washwise_http_request_duration_seconds", "Time to serve a request, last body byte included.", series("latency"))
+        lines += prometheus_histogram("washwise_http_response_size_bytes", "Response body size.", series("response_size"))
+        lines += prometheus_histogram("washwise_http_request_db_queries", "SQL statements issued per request.", series("queries"))
+        lines += prometheus_histogram("washwise_http_request_db_seconds", "Time per request spent executing SQL.", series("db_seconds"))
+        return lines
+
+request_metrics = RequestMetrics()
+# Called with (method, route, status, stats) after every request, e.g. query budgets
+request_observers: List[Callable[[str, str, int, RequestStats], None]] = []
+
+def _log_slow_request(method: str, path: str, route: str, status: int, seconds: float, stats: RequestStats):
+    # One record, statements on continuation lines, so log shippers keep them together
+    lines = [
+        f"    [{statement_seconds * 1000:7.1f} ms] {' '.join(statement.split())[:1000]}"
+        for statement, statement_seconds in stats.statements
+    ]
+    if stats.dropped_statements:
+        lines.append(f"    ... and {stats.dropped_statements} more")
+    logger.warning(
+        "Slow request: %s %s (%s) -> %d in %.0f ms, %d queries / %.0f ms in the database%s",
+        method, path, route, status, seconds * 1000, stats.queries, stats.db_seconds * 1000,
+        "".join("\n" + line for line in lines),
+    )
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (it sees streamed bodies to the end, unlike
+    BaseHTTPMiddleware): times each HTTP request, counts its status and body
+    bytes under the matched route template, and attributes the SQL it issued.
+    With record=False nothing is timed or logged: it only counts the SQL for
+    request_observers, and passes requests straight through while there are none.
+    """
+
+    def __init__(self, app, record: bool = True):
+        self.app = app
+        self.record = record
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.record or request_observers):
+            return await self.app(scope, receive, send)
+
+        # Set when a test or query budget counts around the whole request
+        outer = current_request.get()
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        request_metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            request_metrics.in_flight -= 1
+            current_request.reset(token)
+            if outer is not None:
+                stats.merge_into(outer)
+            # FastAPI leaves the matched APIRoute in the (shared) scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            if self.record:
+                request_metrics.observe(scope["method"], route, status, seconds, size, stats)
+                if seconds >= settings.SLOW_REQUEST_SECONDS:
+                    _log_slow_request(scope["method"], scope["path"], route, status, seconds, stats)
+            for observer in request_observers:
+                observer(scope["method"], route, status, stats)
@@ -1,17 +1,27 @@
 # app/core/security.py
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any, Union
 from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def pwd_context():
+    # Built on first use: hashing runs in password_hasher's worker processes,
+    # so the API process never needs passlib loaded
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Like verify_password, but also returns a fresh hash if pwd_context deprecates the stored one."""
+    return pwd_context().verify_and_update(plain_password, hashed_password)
 
 def create_access_token(subject: Union[str, Any], role: str, user_id: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
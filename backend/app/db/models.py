@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Enum as SAEnum, DateTime, ForeignKey, Float, Boolean, JSON
+from sqlalchemy import Column, String, Integer, Enum as SAEnum, Date, DateTime, ForeignKey, Float, Boolean, JSON, Text, Index
 from sqlalchemy.orm import relationship
 import enum
 import uuid
@@ -28,7 +28,6 @@ class User(Base):
     # --- Subscription Fields ---
     membership_plan = Column(SAEnum(MembershipPlanEnum), default=MembershipPlanEnum.none)
     membership_expiry_date = Column(DateTime(timezone=True), nullable=True)
-    monthly_services_used = Column(JSON, nullable=True)
     
     static_qr_codes = Column(JSON, nullable=True)
 
@@ -36,16 +35,43 @@ class User(Base):
     reset_token = Column(String(255), nullable=True, unique=True, index=True)
     reset_token_expiry = Column(DateTime(timezone=True), nullable=True)
 
+    # --- Plan usage for the current period ---
+    # Not a column: loaded from service_usage by usage_repo.load_usage()
+    _monthly_usage = None
+
+    @property
+    def monthly_services_used(self) -> dict:
+        return self._monthly_usage or {}
+
+    @monthly_services_used.setter
+    def monthly_services_used(self, usage: dict):
+        self._monthly_usage = usage
+
+class ServiceUsage(Base):
+    """
+    Plan-covered services used per user, period ("YYYY-MM") and service.
+    A new month is simply a new key, so counters never need resetting.
+    """
+    __tablename__ = "service_usage"
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = Column(String(7), primary_key=True)
+    service_name = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 
 class Order(Base):
     __tablename__ = "orders"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     owner_id = Column(String(36), ForeignKey("users.id"))
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     total_cost = Column(Float, default=0.0)
     payment_status = Column(String(20), default="unpaid")
     is_covered_by_plan = Column(Boolean, default=False)
     qr_code_path = Column(String(255), nullable=True)
+    # Items not yet picked up; maintained by OrderService in the same transaction
+    active_item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every OrderService write to the order or its items (HTTP ETags)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     owner = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
@@ -58,5 +84,80 @@ class OrderItem(Base):
     quantity = Column(Integer, nullable=False)
     cost = Column(Float, default=0.0)
     status = Column(String(50), nullable=False, default="pending")
+    # When the item entered its current status (stage durations, ETAs)
+    status_changed_at = Column(DateTime(timezone=True), nullable=True)
+
+    order = relationship("Order", back_populates="items")
+
+class ItemStatusTransition(Base):
+    """
+    Append-only log of item status changes, written in the same transaction
+    as the change. stage_seconds is how long the item spent in from_status
+    (None for the initial entry or when that is unknown).
+    """
+    __tablename__ = "item_status_transitions"
+    # Integer key: the ETA aggregator tails the log by id
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(String(36), ForeignKey("order_items.id", ondelete="CASCADE"), nullable=False)
+    service_name = Column(String(100), nullable=False)
+    from_status = Column(String(50), nullable=True)
+    to_status = Column(String(50), nullable=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+    changed_by = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    stage_seconds = Column(Float, nullable=True)
+
+# --- Indexes (matched to the repository queries; created by migrations) ---
+# Customer order pages: WHERE owner_id = ? ORDER BY created_at DESC, id DESC
+Index("ix_orders_owner_id_created_at", Order.owner_id, Order.created_at.desc(), Order.id.desc())
+# Staff order pages and keyset cursors: ORDER BY created_at DESC, id DESC
+Index("ix_orders_created_at", Order.created_at.desc(), Order.id.desc())
+# Active orders of a customer: only orders with open items are in the index
+Index(
+    "ix_orders_owner_id_active", Order.owner_id, Order.created_at.desc(), Order.id.desc(),
+    postgresql_where=Order.active_item_count > 0,
+    sqlite_where=Order.active_item_count > 0,
+)
+# Item loading (order_id IN ...) and the status filter (EXISTS ... order_id = ? AND status = ?)
+Index("ix_order_items_order_id_status", OrderItem.order_id, OrderItem.status)
+# History of one item: WHERE item_id = ? ORDER BY id
+Index("ix_item_status_transitions_item_id", ItemStatusTransition.item_id, ItemStatusTransition.id)
+# ETA warm-up: WHERE changed_at >= ? (the last ETA_WINDOW_DAYS)
+Index("ix_item_status_transitions_changed_at", ItemStatusTransition.changed_at)
+
+class DailyServiceRollup(Base):
+    """
+    Reporting counters per UTC day and service, bumped by OrderService in the
+    same transaction as the change they count; /reports reads only these.
+    Each counter is bucketed by the day its event happened (ordered, paid,
+    picked up).
+    """
+    __tablename__ = "daily_service_rollups"
+    day = Column(Date, primary_key=True)
+    service_name = Column(String(100), primary_key=True)
+    items_ordered = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    covered_items = Column(Integer, nullable=False, default=0)
+    billed = Column(Float, nullable=False, default=0.0)         # cost of the lines ordered
+    paid_revenue = Column(Float, nullable=False, default=0.0)   # cost of the lines paid
+    items_completed = Column(Integer, nullable=False, default=0)
+
+class NotificationOutbox(Base):
+    """
+    Emails waiting to be delivered. Rows are written in the same transaction
+    as the change they announce and drained by the notification worker.
+    """
+    __tablename__ = "notification_outbox"
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    email_to = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    # pending -> sent | dead
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    sent_at = Column(DateTime(timezone=True), nullable=True)
 
-    order = relationship("Order", back_populates="items")
\ No newline at end of file
+# Worker claim: WHERE status = 'pending' AND next_attempt_at <= now ORDER BY next_attempt_at
+Index("ix_notification_outbox_due", NotificationOutbox.status, NotificationOutbox.next_attempt_at)
@@ -0,0 +1,112 @@
+# app/db/pool_metrics.py
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import Histogram, prometheus_histogram, prometheus_metric
+
+class PoolMetrics:
+    """Checkout-wait histogram and lifecycle counters for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_wait = Histogram()
+        self.counters = {
+            "checkouts": 0,
+            "checkins": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+        }
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def incr(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def bind(self, engine: Engine):
+        """Registers pool event listeners on `engine` (they survive pool recreation)."""
+        self._engine = engine
+        event.listen(engine, "checkout", lambda *args: self.incr("checkouts"))
+        event.listen(engine, "checkin", lambda *args: self.incr("checkins"))
+        event.listen(engine, "connect", lambda *args: self.incr("connects"))
+        # Fired for stale connections caught by pre-ping, among others
+        event.listen(engine, "invalidate", lambda *args: self.incr("invalidations"))
+
+    def snapshot(self) -> dict:
+        pool = self._engine.pool if self._engine is not None else None
+        gauges = {}
+        if isinstance(pool, QueuePool):
+            gauges = {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "pool": type(pool).__name__ if pool is not None else None,
+            "gauges": gauges,
+            "counters": counters,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+        }
+
+class _TimedCheckoutMixin:
+    """
+    Times Pool.connect(), i.e. queue wait + pre-ping (+ connect on a miss).
+    Pool events only fire after a connection is handed out, so the wait
+    itself has to be measured here.
+    """
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        finally:
+            self.metrics.checkout_wait.observe(time.perf_counter() - start)
+
+def timed_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """
+    Builds a `base` subclass that reports into `metrics`. The metrics live on
+    the class so they carry over when SQLAlchemy recreates the pool.
+    """
+    return type(f"Timed{base.__name__}", (_TimedCheckoutMixin, base), {"metrics": metrics})
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+SyncPool = timed_pool_class(QueuePool, sync_pool_metrics)
+AsyncPool = timed_pool_class(AsyncAdaptedQueuePool, async_pool_metrics)
+
+def get_pool_stats() -> dict:
+    return {m.name: m.snapshot() for m in (sync_pool_metrics, async_pool_metrics)}
+
+def render_pool_metrics() -> list[str]:
+    stats = get_pool_stats()
+    gauges = sorted({gauge for pool in stats.values() for gauge in pool["gauges"]})
+    counters = sorted({counter for pool in stats.values() for counter in pool["counters"]})
+    lines = []
+    for gauge in gauges:
+        lines += prometheus_metric(
+            f"washwise_db_pool_{gauge}", "gauge", f"Connection pool {gauge.replace('_', ' ')}.",
+            [({"engine": name}, pool["gauges"][gauge]) for name, pool in stats.items() if gauge in pool["gauges"]],
+        )
+    for counter in counters:
+        lines += prometheus_metric(
+            f"washwise_db_pool_{counter}_total", "counter", f"Connection pool {counter}.",
+            [({"engine": name}, pool["counters"][counter]) for name, pool in stats.items()],
+        )
+    lines += prometheus_histogram(
+        "washwise_db_pool_checkout_wait_seconds", "Time to get a connection from the pool.",
+        [({"engine": name}, pool["checkout_wait_seconds"]) for name, pool in stats.items()],
+    )
+    return lines
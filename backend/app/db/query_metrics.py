@@ -0,0 +1,56 @@
+# app/db/query_metrics.py
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import Histogram, prometheus_histogram, prometheus_metric
+from app.core.request_metrics import current_request
+
+class QueryMetrics:
+    """Every statement on every engine, timed and attributed to the current request."""
+
+    def __init__(self):
+        self.duration = Histogram()
+        self._lock = threading.Lock()
+        self.in_requests = 0
+        self.outside_requests = 0   # background workers, scripts
+
+    def record(self, statement: str, seconds: float):
+        self.duration.observe(seconds)
+        stats = current_request.get()
+        if stats is not None:
+            # Async engines run these hooks in a greenlet that carries the
+            # request task's context, so the right request is found here too
+            stats.record_query(statement, seconds)
+        with self._lock:
+            if stats is not None:
+                self.in_requests += 1
+            else:
+                self.outside_requests += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            counts = [({"scope": "request"}, self.in_requests), ({"scope": "background"}, self.outside_requests)]
+        lines = prometheus_metric("washwise_db_queries_total", "counter", "SQL statements executed, inside and outside HTTP requests.", counts)
+        lines += prometheus_histogram("washwise_db_query_duration_seconds", "Time to execute one SQL statement.", [({}, self.duration.snapshot())])
+        return lines
+
+query_metrics = QueryMetrics()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    query_metrics.record(statement, time.perf_counter() - started)
+
+@event.listens_for(Engine, "handle_error")
+def _drop_query_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
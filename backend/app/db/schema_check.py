@@ -0,0 +1,48 @@
+# app/db/schema_check.py
+import os
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import BACKEND_DIR
+from app.repositories.usage_repo import UPSERT_INSERTS
+
+def _script_directory():
+    # alembic is only needed here, at startup
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return ScriptDirectory.from_config(config)
+
+async def check_schema_async(engine: AsyncEngine):
+    """
+    Run from the startup hook (never at import). Refuses to serve from a
+    database that is behind this code's migrations; one that is ahead (newer
+    code mid-rollout) only gets a warning. Also refuses databases the usage
+    ledger and rollups cannot upsert into (they need ON CONFLICT).
+    """
+    dialect = engine.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise RuntimeError(f"Unsupported database {dialect!r}: WashWise runs on {' or '.join(sorted(UPSERT_INSERTS))}")
+
+    scripts = _script_directory()
+    heads = set(scripts.get_heads())
+    async with engine.connect() as conn:
+        try:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+        except Exception:
+            current = set()
+
+    if current == heads:
+        return
+    if current - {script.revision for script in scripts.walk_revisions()}:
+        print(f"⚠️ Database schema {sorted(current)} is newer than this code ({sorted(heads)})")
+        return
+
+    # Close the pooled connection, or aiosqlite's thread keeps the process alive
+    await engine.dispose()
+    if not current:
+        raise RuntimeError("Database has no schema version; run `alembic upgrade head` first")
+    raise RuntimeError(f"Database schema {sorted(current)} is behind this code ({sorted(heads)}); run `alembic upgrade head`")
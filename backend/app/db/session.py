@@ -1,19 +1,63 @@
 # app/db/session.py
+from contextlib import asynccontextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool_metrics import SyncPool, AsyncPool, sync_pool_metrics, async_pool_metrics
+import app.db.query_metrics  # noqa: F401  (per-statement timing hooks on every engine)
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI,
     echo=settings.DB_ECHO,
-    future=True
+    future=True,
+    poolclass=SyncPool,
+    **_pool_options()
 )
+sync_pool_metrics.bind(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+# --- Async Engine (asyncpg / aiosqlite) ---
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+    echo=settings.DB_ECHO,
+    poolclass=AsyncPool,
+    **_pool_options()
+)
+async_pool_metrics.bind(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes can't be lazily reloaded on the event loop,
+# so objects must stay readable after commit for response serialization.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# --- Unit of Work ---
+# Groups several repository writes (which only flush) into one transaction:
+# commit once on success, roll everything back on any exception.
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession):
     try:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
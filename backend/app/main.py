@@ -1,22 +1,36 @@
 # app/main.py
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.core.config import settings
-from app.api import auth, orders, users
-from app.db.session import engine
-from app.db.models import Base
+from app.core.http_cache import cached_response, json_body
+from app.core.request_metrics import MetricsMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.api import auth, orders, users, internal, qr, events, reports
+from app.db.session import async_engine
+from app.db.schema_check import check_schema_async
+from app.services.notification_worker import notification_worker
+from app.core.events import event_bus
+from app.core.hashing import password_hasher
+from app.services.label_service import label_service
+from app.services.eta_service import eta_service
 from app.schemas import SERVICE_PRICES, SERVICE_WORKFLOWS # Moved import to top for cleanliness
 
-# Create Tables (Consider using Alembic for production instead)
-Base.metadata.create_all(bind=engine)
+# Importing this module has no side effects (no DB, filesystem or network
+# access); everything stateful happens in the startup hook below. Schema is
+# managed by migrations (`alembic upgrade head`) and only checked at startup.
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
 # --- Middleware ---
+# Added first so it is innermost: shed 503s still get CORS headers and are
+# counted by the metrics middleware
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     SessionMiddleware,
     secret_key=settings.SECRET_KEY,
@@ -38,22 +52,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Added last so it is outermost: times everything, CORS and sessions included.
+# Installed either way: with METRICS_ENABLED off it still attributes SQL for
+# request observers (query budgets), and steps aside when there are none
+app.add_middleware(MetricsMiddleware, record=settings.METRICS_ENABLED)
+
 # --- Static Files (QR Codes) ---
-# Ensure the folder exists
-os.makedirs("qr_codes", exist_ok=True)
-app.mount("/qr_codes", StaticFiles(directory="qr_codes"), name="qrcodes")
+# Legacy PNGs only; new QR codes are rendered on demand under /qr
+# The folder is created at startup, so its existence isn't checked here
+app.mount("/qr_codes", StaticFiles(directory="qr_codes", check_dir=False), name="qrcodes")
 
 # --- Routes ---
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(orders.router, prefix="/orders", tags=["Orders"])
+app.include_router(qr.router, prefix="/qr", tags=["QR Codes"])
+app.include_router(internal.router, prefix="/internal", tags=["Internal"])
+app.include_router(events.router, prefix="/events", tags=["Live Updates"])
+app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+
+@app.on_event("startup")
+async def start_background_services():
+    if settings.SCHEMA_CHECK_ON_STARTUP:
+        await check_schema_async(async_engine)
+    os.makedirs("qr_codes", exist_ok=True)
+    await event_bus.start()
+    if settings.NOTIFY_WORKER_ENABLED:
+        await notification_worker.start()
+    if settings.ETA_ENABLED:
+        await eta_service.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await notification_worker.stop()
+    await eta_service.stop()
+    await event_bus.stop()
+    password_hasher.shutdown()
+    label_service.shutdown()
+    # Close pooled async connections (aiosqlite keeps a worker thread per connection)
+    await async_engine.dispose()
 
 # --- Config Endpoint (The "Truth" for Frontend) ---
+# Static for the life of the process: serialized once, revalidated via ETag
+SYSTEM_CONFIG = json_body({
+    "prices": SERVICE_PRICES,
+    "workflows": SERVICE_WORKFLOWS
+})
+
 @app.get("/system/config")
-def get_system_config():
-    return {
-        "prices": SERVICE_PRICES,
-        "workflows": SERVICE_WORKFLOWS
-    }
\ No newline at end of file
+def get_system_config(request: Request):
+    return cached_response(request, SYSTEM_CONFIG, f"public, max-age={settings.SYSTEM_CONFIG_MAX_AGE}")
\ No newline at end of file
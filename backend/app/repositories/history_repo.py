@@ -0,0 +1,88 @@
+# app/repositories/history_repo.py
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Select, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ItemStatusTransition
+
+def transition_row(
+    item_id: str,
+    service_name: str,
+    from_status: Optional[str],
+    to_status: str,
+    changed_at: datetime,
+    changed_by: Optional[str] = None,
+    entered_at: Optional[datetime] = None,
+) -> dict:
+    """One log entry; `entered_at` is when the item entered from_status, if known."""
+    stage_seconds = None
+    if from_status is not None and entered_at is not None:
+        if entered_at.tzinfo is None:
+            # SQLite hands back naive datetimes; everything is stored as UTC
+            entered_at = entered_at.replace(tzinfo=timezone.utc)
+        stage_seconds = max((changed_at - entered_at).total_seconds(), 0.0)
+    return {
+        "item_id": item_id,
+        "service_name": service_name,
+        "from_status": from_status,
+        "to_status": to_status,
+        "changed_at": changed_at,
+        "changed_by": changed_by,
+        "stage_seconds": stage_seconds,
+    }
+
+class StatusHistoryRepository:
+    # --- Statement Builders ---
+    def _item_history_stmt(self, item_id: str) -> Select:
+        return select(ItemStatusTransition).where(ItemStatusTransition.item_id == item_id).order_by(ItemStatusTransition.id)
+
+    def _first_id_since_stmt(self, since: datetime) -> Select:
+        # Earliest entry by time (ix_item_status_transitions_changed_at); ids follow it closely enough
+        return (
+            select(ItemStatusTransition.id)
+            .where(ItemStatusTransition.changed_at >= since)
+            .order_by(ItemStatusTransition.changed_at)
+            .limit(1)
+        )
+
+    def _stage_durations_select(self) -> Select:
+        return select(
+            ItemStatusTransition.id, ItemStatusTransition.service_name,
+            ItemStatusTransition.from_status, ItemStatusTransition.stage_seconds,
+        )
+
+    def _stage_durations_stmt(self, after_id: int, limit: int) -> Select:
+        """Completed stages logged after `after_id`, in log order (tailed by the ETA aggregator)."""
+        return (
+            self._stage_durations_select()
+            .where(ItemStatusTransition.id > after_id)
+            .order_by(ItemStatusTransition.id)
+            .limit(limit)
+        )
+
+    def _stage_durations_by_id_stmt(self, ids: list[int]) -> Select:
+        """The same columns for specific entries (ids the tail skipped that may have committed since)."""
+        return self._stage_durations_select().where(ItemStatusTransition.id.in_(ids)).order_by(ItemStatusTransition.id)
+
+    # --- Async API ---
+    # Append-only, and like the other repositories nothing here commits
+    async def add_async(self, db: AsyncSession, rows: list[dict]):
+        if rows:
+            await db.execute(insert(ItemStatusTransition), rows)
+
+    async def get_item_history_async(self, db: AsyncSession, item_id: str) -> list[ItemStatusTransition]:
+        result = await db.execute(self._item_history_stmt(item_id))
+        return list(result.scalars().all())
+
+    async def first_id_since_async(self, db: AsyncSession, since: datetime) -> Optional[int]:
+        return (await db.execute(self._first_id_since_stmt(since))).scalar()
+
+    async def get_stage_durations_async(self, db: AsyncSession, after_id: int, limit: int):
+        return (await db.execute(self._stage_durations_stmt(after_id, limit))).all()
+
+    async def get_stage_durations_by_id_async(self, db: AsyncSession, ids: list[int]):
+        return (await db.execute(self._stage_durations_by_id_stmt(ids))).all()
+
+history_repo = StatusHistoryRepository()
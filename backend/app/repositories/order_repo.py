@@ -1,25 +1,295 @@
 # app/repositories/order_repo.py
-from sqlalchemy.orm import Session
-from app.db.models import Order, OrderItem
-from app.schemas import OrderCreate
+import base64
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import Select, Update, and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.models import Order, OrderItem, User
+from app.schemas import FINAL_STATUS
+
+# --- Datetime Binds ---
+# orders.created_at is timestamptz: bind aware UTC datetimes (asyncpg refuses
+# to guess, and SQLite compares the stored UTC text). Naive input means UTC.
+def as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+# --- Keyset Cursor Helpers ---
+# A cursor is the (created_at, id) of the last order on a page, so the next
+# page can start right after it without OFFSET scans.
+def encode_cursor(order: Order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, order_id = raw.split("|", 1)
+        return as_utc(datetime.fromisoformat(created_at)), order_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+# --- Projection Columns (exactly what OrderResponse / OrderItemResponse need) ---
+ORDER_ROW_COLUMNS = (
+    Order.id, Order.owner_id, Order.created_at, Order.total_cost,
+    Order.payment_status, Order.is_covered_by_plan, Order.active_item_count,
+)
+ITEM_ROW_COLUMNS = (
+    OrderItem.order_id, OrderItem.id, OrderItem.service_name,
+    OrderItem.quantity, OrderItem.cost, OrderItem.status, OrderItem.status_changed_at,
+)
 
 class OrderRepository:
-    def create(self, db: Session, order: Order) -> Order:
+    # --- Statement Builders ---
+    def _page_stmt(
+        self,
+        owner_id: Optional[str] = None,
+        status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        stmt: Optional[Select] = None,
+    ) -> Select:
+        """
+        One page of orders, newest first. `stmt` swaps what is selected (e.g.
+        plain columns for the projection path); default: Order entities with
+        their items eager-loaded.
+        """
+        if stmt is None:
+            stmt = select(Order).options(selectinload(Order.items))
+
+        if owner_id:
+            stmt = stmt.where(Order.owner_id == owner_id)
+        if payment_status:
+            stmt = stmt.where(Order.payment_status == payment_status)
+        if status:
+            stmt = stmt.where(Order.items.any(OrderItem.status == status))
+        if cursor:
+            created_at, order_id = decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                Order.created_at < created_at,
+                and_(Order.created_at == created_at, Order.id < order_id)
+            ))
+
+        # Fetch one extra row to know whether another page exists
+        return stmt.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+
+    def _page_rows_stmt(self, **filters) -> Select:
+        return self._page_stmt(stmt=select(*ORDER_ROW_COLUMNS), **filters)
+
+    def _item_rows_stmt(self, order_ids: list[str]) -> Select:
+        return select(*ITEM_ROW_COLUMNS).where(OrderItem.order_id.in_(order_ids))
+
+    def _export_stmt(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        status: Optional[str] = None,
+        payment_status: Optional[str] = None,
+    ) -> Select:
+        """Orders joined to their items, oldest first, one row per item (or per empty order)."""
+        stmt = (
+            select(*ORDER_ROW_COLUMNS[:6], *ITEM_ROW_COLUMNS[1:6])
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        )
+        if created_from:
+            stmt = stmt.where(Order.created_at >= as_utc(created_from))
+        if created_to:
+            stmt = stmt.where(Order.created_at < as_utc(created_to))
+        if payment_status:
+            stmt = stmt.where(Order.payment_status == payment_status)
+        if status:
+            stmt = stmt.where(Order.items.any(OrderItem.status == status))
+        # Keeps each order's items adjacent for the NDJSON grouping
+        return stmt.order_by(Order.created_at, Order.id)
+
+    def _split_page(self, orders: list[Order], limit: int) -> tuple[list[Order], Optional[str]]:
+        if len(orders) > limit:
+            orders = orders[:limit]
+            return orders, encode_cursor(orders[-1])
+        return orders, None
+
+    def _active_stmt(self, owner_id: str, exact: bool = False) -> Select:
+        """
+        A customer's orders that still have items in progress, newest first.
+        Normally served by the active_item_count counter (a range scan over
+        ix_orders_owner_id_active); exact=True evaluates the definition itself
+        with an EXISTS over the items instead.
+        """
+        if exact:
+            is_active = Order.items.any(OrderItem.status != FINAL_STATUS)
+        else:
+            is_active = Order.active_item_count > 0
+        return (
+            select(Order)
+            .options(selectinload(Order.items))
+            .where(Order.owner_id == owner_id, is_active)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+        )
+
+    def _touch_stmt(self, order_ids: list[str], active_delta: int) -> Update:
+        # Relative update, so concurrent writes to one order can't lose counts or versions
+        return (
+            update(Order)
+            .where(Order.id.in_(order_ids))
+            .values(version=Order.version + 1, active_item_count=Order.active_item_count + active_delta)
+            .execution_options(synchronize_session="fetch")
+        )
+
+    def _version_stages_stmt(self, order_id: str) -> Select:
+        """The order's version and its items' (service_name, status), in one query."""
+        return (
+            select(Order.version, OrderItem.service_name, OrderItem.status)
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.id == order_id)
+        )
+
+    def _split_version_stages(self, rows) -> Optional[tuple[int, list[tuple[str, str]]]]:
+        if not rows:
+            return None
+        return rows[0][0], [(service_name, status) for _, service_name, status in rows if service_name is not None]
+
+    def _recount_active_stmt(self) -> Update:
+        """Recomputes every counter from the items (backfill / repair)."""
+        open_items = (
+            select(func.count(OrderItem.id))
+            .where(OrderItem.order_id == Order.id, OrderItem.status != FINAL_STATUS)
+            .scalar_subquery()
+        )
+        return update(Order).values(active_item_count=open_items).execution_options(synchronize_session=False)
+
+    def _group_deltas(self, deltas: dict[str, int]) -> dict[int, list[str]]:
+        # {order_id: delta} -> {delta: [order_ids]}: one UPDATE per distinct delta
+        groups: dict[int, list[str]] = {}
+        for order_id, delta in deltas.items():
+            groups.setdefault(delta, []).append(order_id)
+        return groups
+
+    def _order_stmt(self, order_id: str) -> Select:
+        return select(Order).options(selectinload(Order.items)).where(Order.id == order_id)
+
+    def _item_stmt(self, item_id: str) -> Select:
+        return (
+            select(OrderItem)
+            .options(
+                selectinload(OrderItem.order).selectinload(Order.items),
+                selectinload(OrderItem.order).selectinload(Order.owner),
+            )
+            .where(OrderItem.id == item_id)
+        )
+
+    def _status_rows_stmt(self, item_ids: list[str]) -> Select:
+        # Plain columns (no ORM objects) for bulk status changes; rows stay
+        # locked until the caller commits so validation can't go stale.
+        return (
+            select(
+                OrderItem.id, OrderItem.service_name, OrderItem.status, OrderItem.status_changed_at,
+                Order.id.label("order_id"), User.id.label("owner_id"), User.email,
+            )
+            .join(Order, OrderItem.order_id == Order.id)
+            .join(User, Order.owner_id == User.id)
+            .where(OrderItem.id.in_(item_ids))
+            .with_for_update(of=OrderItem)
+        )
+
+    def _bulk_status_stmt(self, new_statuses: dict[str, str], changed_at: datetime) -> Update:
+        # One UPDATE ... SET status = CASE id WHEN ... END for the whole batch
+        return (
+            update(OrderItem)
+            .where(OrderItem.id.in_(list(new_statuses)))
+            .values(status=case(new_statuses, value=OrderItem.id), status_changed_at=changed_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    # --- Async API ---
+    # add/add_all only flush (IDs and defaults get assigned) and leave the
+    # commit to the caller, e.g. a service running inside async_unit_of_work().
+    async def add_async(self, db: AsyncSession, order: Order) -> Order:
         db.add(order)
-        db.commit()
-        db.refresh(order)
+        await db.flush()
         return order
 
-    def add_items(self, db: Session, items: list[OrderItem]):
+    async def add_all_async(self, db: AsyncSession, items: list[OrderItem]):
         db.add_all(items)
-        db.commit()
+        await db.flush()
+
+    async def create_async(self, db: AsyncSession, order: Order) -> Order:
+        await self.add_async(db, order)
+        await db.commit()
+        await db.refresh(order)
+        return order
+
+    async def add_items_async(self, db: AsyncSession, items: list[OrderItem]):
+        await self.add_all_async(db, items)
+        await db.commit()
+
+    async def list_page_async(self, db: AsyncSession, limit: int = 50, **filters) -> tuple[list[Order], Optional[str]]:
+        """
+        Returns one page of orders (newest first) with their items eager-loaded,
+        plus the cursor for the next page (None on the last page).
+        Filters: owner_id, status, payment_status, cursor.
+        """
+        result = await db.execute(self._page_stmt(limit=limit, **filters))
+        return self._split_page(list(result.scalars().all()), limit)
+
+    async def get_by_owner_async(self, db: AsyncSession, owner_id: str, **page_args):
+        return await self.list_page_async(db, owner_id=owner_id, **page_args)
+
+    async def list_page_rows_async(self, db: AsyncSession, limit: int = 50, **filters) -> tuple[list, list, Optional[str]]:
+        """
+        Same page as list_page_async(), as plain row tuples (no ORM objects):
+        (order rows, item rows of those orders, next cursor).
+        """
+        result = await db.execute(self._page_rows_stmt(limit=limit, **filters))
+        orders, next_cursor = self._split_page(result.all(), limit)
+        items = (await db.execute(self._item_rows_stmt([o.id for o in orders]))).all() if orders else []
+        return orders, items, next_cursor
+
+    async def stream_export_rows_async(self, db: AsyncSession, batch_size: int, **filters) -> AsyncIterator[list]:
+        """
+        Yields _export_stmt rows in lists of `batch_size` from a server-side
+        cursor (never the whole result at once).
+        """
+        result = await db.stream(self._export_stmt(**filters), execution_options={"yield_per": batch_size})
+        async for rows in result.partitions():
+            yield rows
+
+    async def get_by_id_async(self, db: AsyncSession, order_id: str):
+        result = await db.execute(self._order_stmt(order_id))
+        return result.scalars().first()
+
+    async def get_item_by_id_async(self, db: AsyncSession, item_id: str):
+        result = await db.execute(self._item_stmt(item_id))
+        return result.scalars().first()
+
+    async def get_active_by_owner_async(self, db: AsyncSession, owner_id: str, exact: bool = False) -> list[Order]:
+        result = await db.execute(self._active_stmt(owner_id, exact))
+        return list(result.scalars().all())
+
+    async def touch_orders_async(self, db: AsyncSession, active_deltas: dict[str, int]):
+        """
+        Records a write to each order: bumps its version and applies
+        {order_id: change in open items}. The commit is the caller's.
+        """
+        for delta, order_ids in self._group_deltas(active_deltas).items():
+            await db.execute(self._touch_stmt(order_ids, delta))
+
+    async def get_version_stages_async(self, db: AsyncSession, order_id: str) -> Optional[tuple[int, list[tuple[str, str]]]]:
+        """(version, [(service_name, status), ...]), or None if there is no such order."""
+        result = await db.execute(self._version_stages_stmt(order_id))
+        return self._split_version_stages(result.all())
+
+    async def recount_active_items_async(self, db: AsyncSession):
+        await db.execute(self._recount_active_stmt())
 
-    def get_by_owner(self, db: Session, owner_id: str):
-        return db.query(Order).filter(Order.owner_id == owner_id).order_by(Order.created_at.desc()).all()
+    async def get_status_rows_async(self, db: AsyncSession, item_ids: list[str]):
+        result = await db.execute(self._status_rows_stmt(item_ids))
+        return result.all()
 
-    def get_by_id(self, db: Session, order_id: str):
-        return db.query(Order).filter(Order.id == order_id).first()
-    def get_item_by_id(self, db: Session, item_id: str):
-        return db.query(OrderItem).filter(OrderItem.id == item_id).first()
+    async def set_statuses_async(self, db: AsyncSession, new_statuses: dict[str, str], changed_at: datetime):
+        """Bulk status change; like add_async(), leaves the commit to the caller."""
+        if new_statuses:
+            await db.execute(self._bulk_status_stmt(new_statuses, changed_at))
 
-order_repo = OrderRepository()
\ No newline at end of file
+order_repo = OrderRepository()
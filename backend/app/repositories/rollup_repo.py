@@ -0,0 +1,72 @@
+# app/repositories/rollup_repo.py
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import DailyServiceRollup
+from app.repositories.usage_repo import UPSERT_INSERTS
+
+COUNTERS = ("items_ordered", "quantity", "covered_items", "billed", "paid_revenue", "items_completed")
+
+# {(day, service_name): {counter: delta}}
+RollupDeltas = Dict[Tuple[date, str], Dict[str, float]]
+
+def add_delta(deltas: RollupDeltas, day: date, service_name: str, **counters):
+    """Accumulates counter changes for one rollup row (merged before writing)."""
+    row = deltas.setdefault((day, service_name), {})
+    for counter, value in counters.items():
+        row[counter] = row.get(counter, 0) + value
+
+class RollupRepository:
+    # --- Statement Builders ---
+    def _bump_stmt(self, dialect: str, deltas: RollupDeltas):
+        """
+        One multi-row upsert adding every delta to its row. Keys are sorted so
+        concurrent transactions lock shared rows in the same order.
+        """
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f"Rollups need ON CONFLICT support ({dialect} is not supported)")
+        rows = [
+            {"day": day, "service_name": service_name, **{c: deltas[day, service_name].get(c, 0) for c in COUNTERS}}
+            for day, service_name in sorted(deltas)
+        ]
+        stmt = insert(DailyServiceRollup).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[DailyServiceRollup.day, DailyServiceRollup.service_name],
+            set_={c: getattr(DailyServiceRollup, c) + getattr(stmt.excluded, c) for c in COUNTERS},
+        )
+
+    def _daily_stmt(self, date_from: date, date_to: date, service_name: Optional[str] = None) -> Select:
+        stmt = select(DailyServiceRollup).where(DailyServiceRollup.day.between(date_from, date_to))
+        if service_name:
+            stmt = stmt.where(DailyServiceRollup.service_name == service_name)
+        return stmt.order_by(DailyServiceRollup.day, DailyServiceRollup.service_name)
+
+    def _totals(self, rollups: list[DailyServiceRollup]) -> list[dict]:
+        # Summed here rather than GROUP BY: the range is bounded (days x services)
+        # and the rows already arrive in primary-key order, so no sort is needed
+        totals: Dict[str, dict] = {}
+        for rollup in rollups:
+            row = totals.setdefault(rollup.service_name, {"service_name": rollup.service_name, **dict.fromkeys(COUNTERS, 0)})
+            for counter in COUNTERS:
+                row[counter] += getattr(rollup, counter)
+        return [totals[name] for name in sorted(totals)]
+
+    # --- Async API ---
+    # Like usage_repo, nothing here commits: rollups move with the caller's transaction
+    async def add_async(self, db: AsyncSession, deltas: RollupDeltas):
+        if deltas:
+            await db.execute(self._bump_stmt(db.get_bind().dialect.name, deltas))
+
+    async def get_daily_async(self, db: AsyncSession, date_from: date, date_to: date, service_name: Optional[str] = None) -> list[DailyServiceRollup]:
+        result = await db.execute(self._daily_stmt(date_from, date_to, service_name))
+        return list(result.scalars().all())
+
+    async def get_totals_async(self, db: AsyncSession, date_from: date, date_to: date) -> list[dict]:
+        """Per-service sums over the range, ordered by service_name."""
+        return self._totals(await self.get_daily_async(db, date_from, date_to))
+
+rollup_repo = RollupRepository()
@@ -0,0 +1,105 @@
+# app/repositories/usage_repo.py
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import Delete, Select, Update, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ServiceUsage, User
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE ... WHERE (the two the app runs on)
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def current_period(now: Optional[datetime] = None) -> str:
+    return (now or datetime.now(timezone.utc)).strftime("%Y-%m")
+
+class UsageRepository:
+    # --- Statement Builders ---
+    def _claim_stmt(self, dialect: str, user_id: str, wanted: Dict[str, int], limit: int, period: str):
+        """
+        One atomic multi-row statement for all services of an order: insert
+        each counter at its wanted uses (capped at `limit`), or add them to it
+        when that stays within `limit`. Returns (service_name, new count) for
+        every counter it changed; a conflict that would overshoot is skipped
+        but stays locked, for _fill_stmt. Rows go in name order so concurrent
+        orders lock them in the same order.
+        """
+        insert = UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            raise NotImplementedError(f"Usage ledger needs ON CONFLICT support ({dialect} is not supported)")
+        stmt = insert(ServiceUsage).values([
+            {"user_id": user_id, "period": period, "service_name": name, "count": min(uses, limit)}
+            for name, uses in sorted(wanted.items())
+        ])
+        return stmt.on_conflict_do_update(
+            index_elements=[ServiceUsage.user_id, ServiceUsage.period, ServiceUsage.service_name],
+            set_={"count": ServiceUsage.count + stmt.excluded.count},
+            where=ServiceUsage.count + stmt.excluded.count <= limit,
+        ).returning(ServiceUsage.service_name, ServiceUsage.count)
+
+    def _counts_stmt(self, user_id: str, service_names: list[str], period: str) -> Select:
+        return select(ServiceUsage.service_name, ServiceUsage.count).where(
+            ServiceUsage.user_id == user_id, ServiceUsage.period == period, ServiceUsage.service_name.in_(service_names)
+        ).with_for_update()
+
+    def _fill_stmt(self, user_id: str, service_names: list[str], limit: int, period: str) -> Update:
+        # Whatever is left below the limit goes to this order
+        return update(ServiceUsage).where(
+            ServiceUsage.user_id == user_id, ServiceUsage.period == period,
+            ServiceUsage.service_name.in_(service_names), ServiceUsage.count < limit,
+        ).values(count=limit)
+
+    def _usage_stmt(self, user_ids: list[str], period: str) -> Select:
+        return select(ServiceUsage.user_id, ServiceUsage.service_name, ServiceUsage.count).where(
+            ServiceUsage.user_id.in_(user_ids), ServiceUsage.period == period
+        )
+
+    def _reset_stmt(self, user_id: str, period: str) -> Delete:
+        return delete(ServiceUsage).where(ServiceUsage.user_id == user_id, ServiceUsage.period == period)
+
+    def _group(self, rows) -> Dict[str, Dict[str, int]]:
+        usage: Dict[str, Dict[str, int]] = {}
+        for user_id, service_name, count in rows:
+            usage.setdefault(user_id, {})[service_name] = count
+        return usage
+
+    def _attach(self, users: Iterable[User], usage: Dict[str, Dict[str, int]]):
+        for user in users:
+            user.monthly_services_used = usage.get(user.id, {})
+
+    # --- Async API ---
+    # Like order_repo.add_async(), nothing here commits: claims and resets belong
+    # to the caller's transaction (a failed order gives its uses back).
+    async def claim_async(self, db: AsyncSession, user_id: str, wanted: Dict[str, int], limit: int, period: Optional[str] = None) -> Dict[str, int]:
+        """
+        Claims up to wanted[service_name] uses per service without any counter
+        passing `limit`; returns {service_name: uses granted}. One statement,
+        plus two more only for services this order takes to the limit.
+        """
+        if limit <= 0 or not wanted:
+            return {}
+        period = period or current_period()
+        result = await db.execute(self._claim_stmt(db.get_bind().dialect.name, user_id, wanted, limit, period))
+        # Inserted counters hold exactly what was added; updated ones hold more
+        granted = {name: min(count, wanted[name], limit) for name, count in result.all()}
+        short = [name for name in sorted(wanted) if name not in granted]
+        if short:
+            counts = dict((await db.execute(self._counts_stmt(user_id, short, period))).all())
+            await db.execute(self._fill_stmt(user_id, short, limit, period))
+            granted.update({name: limit - counts[name] for name in short if counts[name] < limit})
+        return granted
+
+    async def get_usage_async(self, db: AsyncSession, user_ids: list[str], period: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{user_id: {service_name: count}} for the period (default: current)."""
+        result = await db.execute(self._usage_stmt(user_ids, period or current_period()))
+        return self._group(result.all())
+
+    async def load_usage_async(self, db: AsyncSession, users: list[User]):
+        """Fills user.monthly_services_used for every user with one query."""
+        self._attach(users, await self.get_usage_async(db, [user.id for user in users]))
+
+    async def reset_async(self, db: AsyncSession, user_id: str, period: Optional[str] = None):
+        await db.execute(self._reset_stmt(user_id, period or current_period()))
+
+usage_repo = UsageRepository()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List, Dict, Literal
+from datetime import date, datetime
 from app.db.models import MembershipPlanEnum
 
 # --- Service-specific workflows ---
@@ -12,6 +12,15 @@ SERVICE_WORKFLOWS = {
     "steam_iron": ["pending", "started", "steaming", "pressing", "finishing", "ready_for_pickup", "picked_up"]
 }
 
+# Every workflow ends here; an item in any other status is still "active"
+FINAL_STATUS = "picked_up"
+# ...just after this one, which is what estimated ready times aim at
+READY_STATUS = "ready_for_pickup"
+
+# --- Extra allowed transitions on top of the forward-only workflows ---
+# e.g. {"premium_wash": [("quality_check", "washing")]} to allow rework loops
+SERVICE_EXTRA_TRANSITIONS: Dict[str, List[tuple]] = {}
+
 # --- Service Pricing with Per-Unit Costs (keys must match workflows) ---
 SERVICE_PRICES = {
     "wash_and_fold": {"name": "Wash and Fold", "price": 10},
@@ -21,10 +30,28 @@ SERVICE_PRICES = {
     "steam_iron": {"name": "Steam Iron", "price": 15},
 }
 
+# Plan-covered uses per service per calendar month
+MONTHLY_SERVICE_LIMIT = 4
+
 # --- Schema for updating a status ---
 class StatusUpdate(BaseModel):
     status: str
 
+# --- Schemas for batch status updates (scanning stations) ---
+class ItemStatusChange(BaseModel):
+    item_id: str
+    status: str
+
+class BatchStatusUpdate(BaseModel):
+    updates: List[ItemStatusChange] = Field(..., min_length=1, max_length=500)
+
+class ItemStatusResult(BaseModel):
+    item_id: str
+    ok: bool
+    status: Optional[str] = None
+    possible_next_statuses: List[str] = []
+    error: Optional[str] = None
+
 # --- Schemas for Creating an Order ---
 class ServiceOrderItemCreate(BaseModel):
     service_name: str
@@ -34,6 +61,13 @@ class OrderCreate(BaseModel):
     customer_username: str
     services: List[ServiceOrderItemCreate]
 
+# --- Schema for bulk label printing ---
+class LabelSheetRequest(BaseModel):
+    # Either explicit orders, or every order created since a point in time
+    order_ids: Optional[List[str]] = None
+    created_since: Optional[datetime] = None
+    format: Literal["pdf", "png"] = "pdf"
+
 # --- Schemas for API Responses ---
 class OrderItemResponse(BaseModel):
     id: str
@@ -42,6 +76,7 @@ class OrderItemResponse(BaseModel):
     cost: float
     status: str
     possible_next_statuses: List[str] = []
+    estimated_ready_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -53,12 +88,49 @@ class OrderResponse(BaseModel):
     total_cost: float
     payment_status: str
     is_covered_by_plan: bool
+    active_item_count: int = 0
+    estimated_ready_at: Optional[datetime] = None
     qr_code_url: Optional[str] = None
     items: List[OrderItemResponse]
 
     class Config:
         from_attributes = True
 
+class ItemStatusTransitionResponse(BaseModel):
+    from_status: Optional[str] = None
+    to_status: str
+    changed_at: datetime
+    changed_by: Optional[str] = None
+    stage_seconds: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+# --- Reporting Schemas (served from the daily rollups) ---
+class ServiceRollup(BaseModel):
+    service_name: str
+    items_ordered: int
+    quantity: int
+    covered_items: int
+    billed: float
+    paid_revenue: float
+    items_completed: int
+
+    class Config:
+        from_attributes = True
+
+class DailyServiceRollupResponse(ServiceRollup):
+    day: date
+
+class ReportSummary(BaseModel):
+    date_from: date
+    date_to: date
+    services: List[ServiceRollup]
+    billed: float
+    paid_revenue: float
+    items_ordered: int
+    items_completed: int
+
 # --- User and Subscription Schemas ---
 class SubscriptionCreate(BaseModel):
     plan: MembershipPlanEnum
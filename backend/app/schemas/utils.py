@@ -1,31 +1,48 @@
+import io
 import os
-import qrcode
-from PIL import Image
 import json
 
 QR_FOLDER = "qr_codes"
 
-# Create QR codes directory if it doesn't exist
-os.makedirs(QR_FOLDER, exist_ok=True)
+# qrcode (and PIL behind it) are imported on first use: importing the app
+# should not pay for them, and most workers never render a QR code
+
+def _build_qr(data: dict, mask_pattern: int = None) -> "qrcode.QRCode":
+    import qrcode
+
+    # A fixed mask_pattern skips the best-mask search (most of the encode time)
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+        mask_pattern=mask_pattern,
+    )
+    qr.add_data(json.dumps(data))
+    qr.make(fit=True)
+    return qr
+
+def render_qr(data: dict, fmt: str = "png") -> bytes:
+    """Render a QR code for given data into memory ("png" or "svg")."""
+    qr = _build_qr(data)
+    if fmt == "svg":
+        from qrcode.image.svg import SvgPathImage
+
+        qr_img = qr.make_image(image_factory=SvgPathImage)
+    else:
+        qr_img = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    qr_img.save(buffer)
+    return buffer.getvalue()
 
 def generate_qr(data: dict, filename: str) -> str:
     """Generate QR code for given data and save with a specific filename."""
     try:
-        qr_data = json.dumps(data) 
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        qr_img = qr.make_image(fill_color="black", back_color="white")
+        qr_img = _build_qr(data).make_image(fill_color="black", back_color="white")
         
-        # Use the provided filename
+        # Use the provided filename (created here, not at import)
+        os.makedirs(QR_FOLDER, exist_ok=True)
         qr_path = os.path.join(QR_FOLDER, filename)
         qr_img.save(qr_path)
         
@@ -0,0 +1,246 @@
+# app/services/eta_service.py
+import asyncio
+import bisect
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.repositories.history_repo import history_repo
+from app.schemas import FINAL_STATUS, READY_STATUS
+from app.services.workflow_engine import workflow_engine
+
+# --- Fixed Histogram Buckets (shared by every service and stage) ---
+# Geometric from 10 s to 60 days, ~7% apart: quantiles are accurate to a few
+# percent with ~200 counters per histogram, however many samples arrive
+BUCKET_MIN_SECONDS = 10.0
+BUCKET_MAX_SECONDS = 60 * 24 * 3600.0
+BUCKET_GROWTH = 1.07
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(
+    BUCKET_MIN_SECONDS * BUCKET_GROWTH ** i
+    for i in range(math.ceil(math.log(BUCKET_MAX_SECONDS / BUCKET_MIN_SECONDS, BUCKET_GROWTH)) + 1)
+)
+
+class DurationHistogram:
+    """Streaming duration quantiles: counts per fixed bucket, O(1) memory."""
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile in seconds (geometric middle of its bucket)."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == 0:
+                    return BUCKET_MIN_SECONDS / 2
+                if index == len(BUCKET_BOUNDS):
+                    return BUCKET_MAX_SECONDS
+                return math.sqrt(BUCKET_BOUNDS[index - 1] * BUCKET_BOUNDS[index])
+        return BUCKET_MAX_SECONDS
+
+# Longest run of skipped ids remembered at once (older ones are given up first)
+MAX_TRACKED_GAPS = 10_000
+
+def _utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored as UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+class EtaService:
+    """
+    Estimated ready times from per-service, per-stage duration histograms.
+    A background task tails item_status_transitions (every worker reads the
+    shared log, so all of them converge on the same numbers); requests only
+    read the in-memory histograms.
+
+    Log ids are handed out when a transaction inserts, not when it commits,
+    so the tail can pass an id whose transaction is still open. Ids skipped
+    that way are re-read on every poll until they show up or ETA_GAP_SECONDS
+    pass (rolled-back transactions leave gaps for good).
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._histograms: Dict[Tuple[str, str], DurationHistogram] = {}
+        self._last_id: Optional[int] = None
+        # Skipped id -> time.monotonic() when it was first passed over
+        self._gaps: Dict[int, float] = {}
+        # Bumped whenever new durations arrive (reported in stats)
+        self.generation = 0
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Lifecycle ---
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                read = await self.poll_once()
+            except Exception as e:
+                print(f"❌ ETA aggregator error: {e}")
+                read = 0
+            if read < settings.ETA_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.ETA_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    # --- Aggregation ---
+    async def poll_once(self) -> int:
+        """
+        Reads late commits into skipped ids, then the next batch of the tail,
+        into the histograms; returns how many tail entries were read.
+        """
+        self._expire_gaps(time.monotonic())
+        async with self._session_factory() as db:
+            if self._last_id is None:
+                since = datetime.now(timezone.utc) - timedelta(days=settings.ETA_WINDOW_DAYS)
+                first_id = await history_repo.first_id_since_async(db, since)
+                self._last_id = first_id - 1 if first_id is not None else 0
+            late = await history_repo.get_stage_durations_by_id_async(db, list(self._gaps)) if self._gaps else []
+            rows = await history_repo.get_stage_durations_async(db, self._last_id, settings.ETA_BATCH_SIZE)
+        self.ingest(late)
+        self.ingest(rows)
+        return len(rows)
+
+    def _expire_gaps(self, now: float):
+        # Insertion order is id order is age order: the oldest are in front
+        for transition_id, skipped_at in list(self._gaps.items()):
+            if now - skipped_at < settings.ETA_GAP_SECONDS and len(self._gaps) <= MAX_TRACKED_GAPS:
+                break
+            del self._gaps[transition_id]
+
+    def ingest(self, rows: Iterable[tuple]):
+        """
+        rows: (id, service_name, from_status, stage_seconds) in log order,
+        from the tail or late commits; each entry is counted once.
+        """
+        added = False
+        now = time.monotonic()
+        for transition_id, service_name, from_status, stage_seconds in rows:
+            if self._last_id is None:
+                self._last_id = transition_id - 1
+            if transition_id > self._last_id:
+                # Skipped ids may still commit; remember them (the nearest ones, at most)
+                for skipped in range(max(self._last_id + 1, transition_id - MAX_TRACKED_GAPS), transition_id):
+                    self._gaps[skipped] = now
+                self._last_id = transition_id
+            elif self._gaps.pop(transition_id, None) is None:
+                continue  # already counted
+            if from_status is None or stage_seconds is None:
+                continue
+            self._histograms.setdefault((service_name, from_status), DurationHistogram()).add(stage_seconds)
+            added = True
+        if added:
+            self.generation += 1
+
+    def stage_duration(self, service_name: str, status: str) -> Optional[float]:
+        histogram = self._histograms.get((service_name, status))
+        if histogram is None or histogram.total < settings.ETA_MIN_SAMPLES:
+            return None
+        return histogram.quantile(settings.ETA_QUANTILE)
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "last_transition_id": self._last_id,
+            "pending_gaps": len(self._gaps),
+            "stages": {
+                f"{service_name}:{status}": {
+                    "samples": histogram.total,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p90_seconds": histogram.quantile(0.9),
+                }
+                for (service_name, status), histogram in sorted(self._histograms.items())
+            },
+        }
+
+    # --- Estimates ---
+    # Anchored on when the item entered its current stage rather than on "now",
+    # so an estimate only changes with the item or the quantiles of its
+    # remaining stages, and cached order bodies stay valid. It may lie in the
+    # past for late items.
+    def remaining_seconds(self, service_name: str, status: str) -> Optional[float]:
+        """
+        Expected time from entering `status` to READY_STATUS; None if the item
+        is already there (or past it) or some remaining stage has too few samples.
+        """
+        workflow = workflow_engine.get(service_name)
+        if workflow is None:
+            return None
+        start, ready = workflow.state_ids.get(status), workflow.state_ids.get(READY_STATUS)
+        if start is None or ready is None or start >= ready:
+            return None
+
+        remaining = 0.0
+        for state in workflow.states[start:ready]:
+            duration = self.stage_duration(service_name, state)
+            if duration is None:
+                return None
+            remaining += duration
+        return remaining
+
+    def stages_fingerprint(self, stages: Iterable[Tuple[str, str]]) -> str:
+        """
+        Digest of the quantiles behind the estimates of items at these
+        (service_name, status) stages (part of order ETags). Quantiles are
+        bucket midpoints, so workers reading the same log agree on them, and
+        they only move when a stage's median crosses into another bucket.
+        """
+        used = [self.remaining_seconds(service_name, status) for service_name, status in sorted(stages)]
+        return hashlib.sha256(repr(used).encode()).hexdigest()[:12]
+
+    def estimate_item(self, service_name: str, status: str, status_changed_at: Optional[datetime]) -> Optional[datetime]:
+        """
+        When the item should reach READY_STATUS; None if it is already there
+        (or past it), its stage entry time is unknown, or some remaining stage
+        has too few samples.
+        """
+        if status_changed_at is None:
+            return None
+        remaining = self.remaining_seconds(service_name, status)
+        if remaining is None:
+            return None
+        return _utc(status_changed_at) + timedelta(seconds=remaining)
+
+    def estimate_order(self, items: Iterable[tuple]) -> Optional[datetime]:
+        """
+        items: (service_name, status, status_changed_at). The order is ready
+        when its last open item is; None if any open item has no estimate.
+        """
+        latest = None
+        for service_name, status, status_changed_at in items:
+            if status in (READY_STATUS, FINAL_STATUS):
+                continue
+            estimate = self.estimate_item(service_name, status, status_changed_at)
+            if estimate is None:
+                return None
+            latest = estimate if latest is None else max(latest, estimate)
+        return latest
+
+eta_service = EtaService()
@@ -0,0 +1,77 @@
+# app/services/export_service.py
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator
+
+import orjson
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.repositories.order_repo import order_repo
+
+CSV_HEADER = (
+    "order_id", "owner_id", "created_at", "total_cost", "payment_status", "is_covered_by_plan",
+    "item_id", "service_name", "quantity", "cost", "status",
+)
+
+class ExportService:
+    """
+    Streams order history as NDJSON (one order per line, items nested) or CSV
+    (one line per item). Rows come from a server-side cursor in batches of
+    EXPORT_BATCH_SIZE, and each batch is encoded and sent before the next is
+    fetched, so memory stays flat however large the table is.
+    """
+
+    async def _batches(self, filters: dict) -> AsyncIterator[list]:
+        # Own session: a request-scoped one is closed before the body streams
+        async with AsyncSessionLocal() as db:
+            async for rows in order_repo.stream_export_rows_async(db, settings.EXPORT_BATCH_SIZE, **filters):
+                yield rows
+
+    async def stream_ndjson(self, **filters) -> AsyncIterator[bytes]:
+        current = None
+        async for rows in self._batches(filters):
+            lines = []
+            for (order_id, owner_id, created_at, total_cost, payment_status, is_covered_by_plan,
+                 item_id, service_name, quantity, cost, status) in rows:
+                # Rows are ordered by order, so an order's items arrive together
+                if current is None or current["id"] != order_id:
+                    if current is not None:
+                        lines.append(orjson.dumps(current))
+                    current = {
+                        "id": order_id,
+                        "owner_id": owner_id,
+                        "created_at": created_at,
+                        "total_cost": total_cost,
+                        "payment_status": payment_status,
+                        "is_covered_by_plan": is_covered_by_plan,
+                        "items": [],
+                    }
+                if item_id is not None:
+                    current["items"].append({
+                        "id": item_id,
+                        "service_name": service_name,
+                        "quantity": quantity,
+                        "cost": cost,
+                        "status": status,
+                    })
+            if lines:
+                yield b"\n".join(lines) + b"\n"
+        if current is not None:
+            yield orjson.dumps(current) + b"\n"
+
+    async def stream_csv(self, **filters) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+        async for rows in self._batches(filters):
+            for row in rows:
+                writer.writerow("" if value is None else (value.isoformat() if isinstance(value, datetime) else value) for value in row)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+export_service = ExportService()
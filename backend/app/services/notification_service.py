@@ -1,26 +1,54 @@
 # app/services/notification_service.py
-import requests
+import logging
+
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.core.config import settings
+from app.db.models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+def mailgun_configured() -> bool:
+    return bool(settings.MAILGUN_API_KEY and settings.MAILGUN_DOMAIN)
+
+def mailgun_request(email_to: str, subject: str, body: str) -> tuple[str, tuple[str, str], dict]:
+    """Returns (url, auth, form data) for one Mailgun message."""
+    api_url = f"{settings.MAILGUN_API_BASE}/{settings.MAILGUN_DOMAIN}/messages"
+    auth = ("api", settings.MAILGUN_API_KEY)
+    data = {
+        "from": f"WashWise Notifier <mailgun@{settings.MAILGUN_DOMAIN}>",
+        "to": email_to,
+        "subject": subject,
+        "html": body
+    }
+    return api_url, auth, data
 
 class NotificationService:
     def send_email(self, email_to: str, subject: str, body: str):
-        if not settings.MAILGUN_API_KEY or not settings.MAILGUN_DOMAIN:
-            print("⚠️ Mailgun configuration missing. Skipping email.")
+        """Sends immediately (blocking). Prefer enqueue_email for anything transactional."""
+        # Imported on first use; requests is heavy and this path is rarely taken
+        import requests
+
+        if not mailgun_configured():
+            logger.warning("Mailgun configuration missing; not sending email to %s", email_to)
             return
 
-        api_url = f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages"
-        auth = ("api", settings.MAILGUN_API_KEY)
-        data = {
-            "from": f"WashWise Notifier <mailgun@{settings.MAILGUN_DOMAIN}>",
-            "to": email_to,
-            "subject": subject,
-            "html": body
-        }
+        api_url, auth, data = mailgun_request(email_to, subject, body)
         
         try:
-            response = requests.post(api_url, auth=auth, data=data)
+            response = requests.post(api_url, auth=auth, data=data, timeout=settings.NOTIFY_HTTP_TIMEOUT)
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
-            print(f"❌ Failed to send email: {e}")
+            logger.error("Failed to send email to %s: %s", email_to, e)
+
+    # --- Outbox ---
+    # The row is only added to the session; it is committed (or rolled back)
+    # together with the caller's transaction and delivered by the worker
+    # (which leaves it pending while Mailgun is not configured).
+    def enqueue_email(self, db: Session | AsyncSession, email_to: str, subject: str, body: str):
+        message = NotificationOutbox(email_to=email_to, subject=subject, body=body)
+        db.add(message)
+        return message
 
-notification_service = NotificationService()
\ No newline at end of file
+notification_service = NotificationService()
@@ -0,0 +1,180 @@
+# app/services/notification_worker.py
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import NotificationOutbox
+from app.db.session import AsyncSessionLocal
+from app.services.notification_service import mailgun_configured, mailgun_request
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+def due_messages_stmt(now: datetime, limit: int):
+    """Next pending messages to send (served by ix_notification_outbox_due)."""
+    return (
+        select(NotificationOutbox)
+        .where(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+@dataclass
+class ClaimedMessage:
+    id: str
+    email_to: str
+    subject: str
+    body: str
+    attempts: int
+
+@dataclass
+class DeliveryResult:
+    id: str
+    ok: bool
+    retryable: bool = True
+    error: Optional[str] = None
+
+class NotificationWorker:
+    """
+    Drains the notification outbox in the background:
+    1. Claims a batch of due messages (leased, SKIP LOCKED on Postgres).
+    2. Sends them concurrently over one pooled HTTP client.
+    3. Marks them sent, schedules a retry with exponential backoff, or
+       dead-letters them after NOTIFY_MAX_ATTEMPTS / a permanent 4xx.
+    While Mailgun is not configured nothing is claimed: messages stay pending
+    (no attempts used up) until it is.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, transport: Optional["httpx.AsyncBaseTransport"] = None):
+        self._session_factory = session_factory
+        self._transport = transport
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore = asyncio.Semaphore(settings.NOTIFY_CONCURRENCY)
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._unconfigured_logged = False
+
+    # --- Lifecycle ---
+    async def start(self):
+        if self._task is not None:
+            return
+        # Imported here so importing the app does not pay for httpx
+        import httpx
+
+        self._client = httpx.AsyncClient(
+            timeout=settings.NOTIFY_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.NOTIFY_CONCURRENCY,
+                max_keepalive_connections=settings.NOTIFY_CONCURRENCY,
+            ),
+            transport=self._transport,
+        )
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        await self._client.aclose()
+        self._client = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logger.exception("Notification worker error: %s", e)
+                processed = 0
+            # A full batch means there is probably more waiting; go again right away
+            if processed < settings.NOTIFY_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.NOTIFY_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    # --- One Batch ---
+    async def drain_once(self) -> int:
+        if not mailgun_configured():
+            if not self._unconfigured_logged:
+                logger.warning("Mailgun configuration missing; outbox messages stay pending until it is set")
+                self._unconfigured_logged = True
+            return 0
+        self._unconfigured_logged = False
+
+        batch = await self._claim_batch()
+        if not batch:
+            return 0
+        results = await asyncio.gather(*(self._deliver(message) for message in batch))
+        await self._record(batch, results)
+        return len(batch)
+
+    async def _claim_batch(self) -> list[ClaimedMessage]:
+        now = datetime.now(timezone.utc)
+        async with self._session_factory() as db:
+            result = await db.execute(due_messages_stmt(now, settings.NOTIFY_BATCH_SIZE))
+            rows = result.scalars().all()
+            # Lease: if this worker dies mid-batch, the rows become due again later
+            lease_until = now + timedelta(seconds=settings.NOTIFY_CLAIM_LEASE)
+            for row in rows:
+                row.next_attempt_at = lease_until
+            await db.commit()
+            return [ClaimedMessage(r.id, r.email_to, r.subject, r.body, r.attempts) for r in rows]
+
+    async def _deliver(self, message: ClaimedMessage) -> DeliveryResult:
+        import httpx
+
+        api_url, auth, data = mailgun_request(message.email_to, message.subject, message.body)
+        async with self._semaphore:
+            try:
+                response = await self._client.post(api_url, auth=auth, data=data)
+            except httpx.HTTPError as e:
+                return DeliveryResult(message.id, ok=False, error=f"{type(e).__name__}: {e}")
+
+        if response.is_success:
+            return DeliveryResult(message.id, ok=True)
+        # 429 and 5xx are transient; any other 4xx will fail the same way next time
+        retryable = response.status_code == 429 or response.status_code >= 500
+        return DeliveryResult(message.id, ok=False, retryable=retryable, error=f"HTTP {response.status_code}: {response.text[:500]}")
+
+    async def _record(self, batch: list[ClaimedMessage], results: list[DeliveryResult]):
+        now = datetime.now(timezone.utc)
+        attempts = {message.id: message.attempts + 1 for message in batch}
+        async with self._session_factory() as db:
+            rows = await db.execute(select(NotificationOutbox).where(NotificationOutbox.id.in_(attempts)))
+            by_id = {row.id: row for row in rows.scalars()}
+            for result in results:
+                row = by_id.get(result.id)
+                if row is None:
+                    continue
+                row.attempts = attempts[result.id]
+                if result.ok:
+                    row.status = "sent"
+                    row.sent_at = now
+                    row.last_error = None
+                elif not result.retryable or row.attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                    row.status = "dead"
+                    row.last_error = result.error
+                    logger.error("Dead-lettered email to %s after %d attempt(s): %s", row.email_to, row.attempts, result.error)
+                else:
+                    row.last_error = result.error
+                    row.next_attempt_at = now + timedelta(seconds=self._backoff(row.attempts))
+            await db.commit()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(settings.NOTIFY_BACKOFF_MAX, settings.NOTIFY_BACKOFF_BASE * 2 ** (attempts - 1))
+        # Jitter so a Mailgun outage doesn't end in a synchronized retry storm
+        return delay * random.uniform(0.5, 1.0)
+
+notification_worker = NotificationWorker()
@@ -1,134 +1,317 @@
 # app/services/order_service.py
-from sqlalchemy.orm import Session, attributes
-from fastapi import HTTPException 
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.core.events import STAFF_CHANNEL, queue_event, user_channel
+from app.core.principal_cache import principal_cache
+from app.db.session import async_unit_of_work
 from app.repositories.order_repo import order_repo
+from app.repositories.usage_repo import usage_repo
+from app.repositories.rollup_repo import RollupDeltas, add_delta, rollup_repo
+from app.repositories.history_repo import history_repo, transition_row
 from app.db.models import User, Order, OrderItem, MembershipPlanEnum
-from app.schemas import OrderCreate, SERVICE_PRICES, SERVICE_WORKFLOWS
+from app.schemas import OrderCreate, ItemStatusChange, ItemStatusResult, SERVICE_PRICES, FINAL_STATUS, MONTHLY_SERVICE_LIMIT
 from datetime import datetime, timezone
+from typing import Optional
 
 # --- CHANGED: Added missing import ---
 from app.services.notification_service import notification_service
+from app.services.workflow_engine import workflow_engine
 
 class OrderService:
-    def create_order(self, db: Session, order_data: OrderCreate, owner: User) -> Order:
+    # --- Business Rules ---
+    def _coverable_lines(self, order_data: OrderCreate, owner: User) -> list[bool]:
         """
-        Handles the business logic of creating an order:
-        1. Checks subscription validity.
-        2. Calculates costs (applying discounts).
-        3. Updates usage counters.
-        4. Saves to DB via Repository.
+        Per requested line: could the owner's plan cover it (subject to the
+        monthly limit, which is claimed separately in the usage ledger)?
         """
-        total_cost = 0.0
-        is_fully_covered = True
-        
         is_active_subscription = (
-            owner.membership_plan != MembershipPlanEnum.none and 
-            owner.membership_expiry_date and 
+            owner.membership_plan != MembershipPlanEnum.none and
+            owner.membership_expiry_date and
             owner.membership_expiry_date.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
         )
 
-        if owner.monthly_services_used is None:
-            owner.monthly_services_used = {}
-
-        # Prepare Order Object (but don't save yet)
-        db_order = Order(owner_id=owner.id, payment_status="unpaid")
-        
-        # Save order first to generate ID
-        db_order = order_repo.create(db, db_order)
-        
-        order_items = []
-
+        coverable = []
         for item_data in order_data.services:
-            service_info = SERVICE_PRICES.get(item_data.service_name)
-            if not service_info:
+            if item_data.service_name not in SERVICE_PRICES:
                 raise ValueError(f"Invalid service: {item_data.service_name}")
-                
-            item_cost = service_info["price"] * item_data.quantity
-            item_is_covered = False
 
             # --- Business Rule: Subscription Logic ---
+            is_eligible = False
             if is_active_subscription:
-                current_usage = owner.monthly_services_used.get(item_data.service_name, 0)
-                if current_usage < 4:
-                    is_eligible = False
-                    if owner.membership_plan == MembershipPlanEnum.premium:
-                        is_eligible = True
-                    elif owner.membership_plan == MembershipPlanEnum.standard and item_data.service_name in ["wash_and_fold", "wash_and_iron"]:
-                        is_eligible = True
-                    
-                    if is_eligible:
-                        item_cost = 0.0
-                        item_is_covered = True
-                        owner.monthly_services_used[item_data.service_name] = current_usage + 1
-            
-            if not item_is_covered:
-                is_fully_covered = False
+                if owner.membership_plan == MembershipPlanEnum.premium:
+                    is_eligible = True
+                elif owner.membership_plan == MembershipPlanEnum.standard and item_data.service_name in ["wash_and_fold", "wash_and_iron"]:
+                    is_eligible = True
+            coverable.append(is_eligible)
+        return coverable
+
+    def _wanted_uses(self, order_data: OrderCreate, coverable: list[bool]) -> dict[str, int]:
+        """Plan uses to claim per service: one per coverable line."""
+        wanted: dict[str, int] = {}
+        for item_data, is_coverable in zip(order_data.services, coverable):
+            if is_coverable:
+                wanted[item_data.service_name] = wanted.get(item_data.service_name, 0) + 1
+        return wanted
+
+    def _covered_lines(self, order_data: OrderCreate, coverable: list[bool], granted: dict[str, int]) -> list[bool]:
+        """The first granted[service] coverable lines of each service are covered."""
+        remaining = dict(granted)
+        covered = []
+        for item_data, is_coverable in zip(order_data.services, coverable):
+            is_covered = is_coverable and remaining.get(item_data.service_name, 0) > 0
+            if is_covered:
+                remaining[item_data.service_name] -= 1
+            covered.append(is_covered)
+        return covered
 
+    def _build_items(self, order_data: OrderCreate, covered: list[bool]) -> tuple[list[OrderItem], float, bool]:
+        """
+        Prices the requested services; lines in `covered` cost nothing.
+        Returns (items, total_cost, is_fully_covered).
+        """
+        total_cost = 0.0
+        order_items = []
+        now = datetime.now(timezone.utc)
+
+        for item_data, item_is_covered in zip(order_data.services, covered):
+            item_cost = 0.0 if item_is_covered else SERVICE_PRICES[item_data.service_name]["price"] * item_data.quantity
             total_cost += item_cost
-            initial_status = SERVICE_WORKFLOWS.get(item_data.service_name, ["pending"])[0]
-            
+
             new_item = OrderItem(
-                order_id=db_order.id,
                 service_name=item_data.service_name,
                 quantity=item_data.quantity,
                 cost=item_cost,
-                status=initial_status
+                status=workflow_engine.initial_status(item_data.service_name),
+                status_changed_at=now,
             )
             order_items.append(new_item)
 
-        # Update Order Totals
+        return order_items, total_cost, all(covered)
+
+    def _active_delta(self, old_status: str, new_status: str) -> int:
+        """Change in an order's active_item_count when one item moves."""
+        return (new_status != FINAL_STATUS) - (old_status != FINAL_STATUS)
+
+    # --- Reporting Rollups (bucketed by the UTC day the event happens) ---
+    def _today(self):
+        return datetime.now(timezone.utc).date()
+
+    def _order_rollup(self, order_items: list[OrderItem], covered: list[bool], is_paid: bool) -> RollupDeltas:
+        deltas: RollupDeltas = {}
+        today = self._today()
+        for item, item_is_covered in zip(order_items, covered):
+            add_delta(
+                deltas, today, item.service_name,
+                items_ordered=1, quantity=item.quantity, covered_items=int(item_is_covered), billed=item.cost,
+                paid_revenue=item.cost if is_paid else 0.0, items_completed=int(item.status == FINAL_STATUS),
+            )
+        return deltas
+
+    def _payment_rollup(self, order: Order) -> RollupDeltas:
+        deltas: RollupDeltas = {}
+        today = self._today()
+        for item in order.items:
+            add_delta(deltas, today, item.service_name, paid_revenue=item.cost)
+        return deltas
+
+    def _completion_rollup(self, moves) -> RollupDeltas:
+        """`moves`: (service_name, old_status, new_status) per item that changed."""
+        deltas: RollupDeltas = {}
+        today = self._today()
+        for service_name, old_status, new_status in moves:
+            # Picked up counts +1; moving back out of the final status undoes it
+            completed = -self._active_delta(old_status, new_status)
+            if completed:
+                add_delta(deltas, today, service_name, items_completed=completed)
+        return deltas
+
+    # --- Status History ---
+    def _initial_transitions(self, order_items: list[OrderItem], actor_id: Optional[str]) -> list[dict]:
+        # Items have IDs here: order_repo.add() has flushed
+        return [
+            transition_row(item.id, item.service_name, None, item.status, item.status_changed_at, actor_id)
+            for item in order_items
+        ]
+
+    def _batch_transitions(self, rows, new_statuses: dict[str, str], now: datetime, actor_id: Optional[str]) -> list[dict]:
+        return [
+            transition_row(row.id, row.service_name, row.status, new_statuses[row.id], now, actor_id, row.status_changed_at)
+            for row in rows if row.id in new_statuses
+        ]
+
+    def _apply_totals(self, db_order: Order, total_cost: float, is_fully_covered: bool):
         db_order.total_cost = total_cost
         db_order.is_covered_by_plan = is_fully_covered
         if total_cost == 0.0:
             db_order.payment_status = "paid"
 
-        # Persist everything
-        order_repo.add_items(db, order_items)
-        
-        # Flag user as modified to save JSON updates
-        if is_active_subscription:
-            attributes.flag_modified(owner, "monthly_services_used")
-            db.add(owner)
-            db.commit()
-            
-        db.commit()
-        db.refresh(db_order)
-        return db_order
-
-    def process_payment(self, db: Session, order_id: str, user_id: str):
-        order = order_repo.get_by_id(db, order_id)
+    def _check_payable(self, order: Order, user_id: str):
         if not order:
             raise HTTPException(404, "Order not found")
         if order.owner_id != user_id:
             raise HTTPException(403, "Not your order")
-        
-        order.payment_status = "paid"
-        db.commit()
-        db.refresh(order)
-        return order
 
-    def update_item_status(self, db: Session, item_id: str, new_status: str):
-        # 1. Get Item
-        item = order_repo.get_item_by_id(db, item_id)
-        if not item: 
+    def _check_status(self, item: OrderItem, new_status: str):
+        if not item:
             raise HTTPException(404, "Item not found")
+        if not workflow_engine.can_transition(item.service_name, item.status, new_status):
+            raise HTTPException(400, f"Invalid status transition {item.status} -> {new_status}")
 
-        # 2. Validate Workflow
-        workflow = SERVICE_WORKFLOWS.get(item.service_name)
-        if new_status not in workflow:
-            raise HTTPException(400, f"Invalid status {new_status}")
-            
-        # 3. Update DB
-        item.status = new_status
-        db.commit()
-        
-        # 4. Send Email Notification
-        # (This line was failing before because of missing import)
-        owner = item.order.owner
+    def _queue_status_email(self, db: AsyncSession, item: OrderItem, new_status: str):
+        # Written to the outbox in the caller's transaction; delivered by the notification worker
         subject = f"Order Update: {item.service_name}"
         body = f"Your service status is now: <b>{new_status}</b>"
-        notification_service.send_email(owner.email, subject, body)
-        
+        notification_service.enqueue_email(db, item.order.owner.email, subject, body)
+
+    def _plan_status_batch(self, rows, updates: list[ItemStatusChange]) -> tuple[list[ItemStatusResult], dict[str, str], dict[str, int], dict[str, list], list[tuple]]:
+        """
+        Validates every requested transition against the workflows.
+        Returns (per-item results in request order, {item_id: new_status} to
+        apply, {order_id: active_item_count change}, {owner_email:
+        [(service_name, new_status), ...]} to notify, live-update events as
+        _queue_item_event arguments).
+        """
+        rows_by_id = {row.id: row for row in rows}
+        results, new_statuses, changes_by_email, events = [], {}, {}, []
+        active_deltas: dict[str, int] = {}
+
+        for change in updates:
+            row = rows_by_id.get(change.item_id)
+            if row is None:
+                results.append(ItemStatusResult(item_id=change.item_id, ok=False, error="Item not found"))
+                continue
+            if change.item_id in new_statuses:
+                results.append(ItemStatusResult(item_id=change.item_id, ok=False, status=row.status, error="Duplicate item in batch"))
+                continue
+            if not workflow_engine.can_transition(row.service_name, row.status, change.status):
+                results.append(ItemStatusResult(
+                    item_id=change.item_id,
+                    ok=False,
+                    status=row.status,
+                    possible_next_statuses=workflow_engine.next_statuses(row.service_name, row.status),
+                    error=f"Invalid status transition {row.status} -> {change.status}",
+                ))
+                continue
+
+            new_statuses[change.item_id] = change.status
+            changes_by_email.setdefault(row.email, []).append((row.service_name, change.status))
+            events.append((row.owner_id, row.order_id, row.id, row.service_name, change.status))
+            active_deltas[row.order_id] = active_deltas.get(row.order_id, 0) + self._active_delta(row.status, change.status)
+            results.append(ItemStatusResult(
+                item_id=change.item_id,
+                ok=True,
+                status=change.status,
+                possible_next_statuses=workflow_engine.next_statuses(row.service_name, change.status),
+            ))
+
+        return results, new_statuses, active_deltas, changes_by_email, events
+
+    def _queue_batch_emails(self, db: AsyncSession, changes_by_email: dict[str, list]):
+        # One message per customer, however many of their items moved
+        for email, changes in changes_by_email.items():
+            if len(changes) == 1:
+                service_name, new_status = changes[0]
+                subject = f"Order Update: {service_name}"
+                body = f"Your service status is now: <b>{new_status}</b>"
+            else:
+                subject = f"Order Update: {len(changes)} items"
+                lines = "".join(f"<li>{SERVICE_PRICES.get(name, {}).get('name', name)}: <b>{status}</b></li>" for name, status in changes)
+                body = f"Your service statuses have been updated:<ul>{lines}</ul>"
+            notification_service.enqueue_email(db, email, subject, body)
+
+    def _queue_item_event(self, db: AsyncSession, owner_id: str, order_id: str, item_id: str, service_name: str, new_status: str):
+        # Pushed to the owner and the staff dashboard once the transaction commits
+        message = {
+            "type": "item_status",
+            "order_id": order_id,
+            "item_id": item_id,
+            "service_name": service_name,
+            "status": new_status,
+            "possible_next_statuses": list(workflow_engine.next_statuses(service_name, new_status)),
+        }
+        queue_event(db, user_channel(owner_id), message)
+        queue_event(db, STAFF_CHANNEL, message)
+
+    def _queue_payment_event(self, db: AsyncSession, order: Order):
+        message = {"type": "payment", "order_id": order.id, "payment_status": order.payment_status}
+        queue_event(db, user_channel(order.owner_id), message)
+        queue_event(db, STAFF_CHANNEL, message)
+
+    # --- Async API ---
+    async def create_order_async(self, db: AsyncSession, order_data: OrderCreate, owner: User, actor_id: Optional[str] = None) -> Order:
+        """
+        Handles the business logic of creating an order:
+        1. Claims plan-covered uses in the usage ledger (atomic, per service).
+        2. Prices the items (see _build_items).
+        3. Saves order, items, usage, rollups and the items' first status-log
+           entries in one transaction (a single commit persists everything).
+        `actor_id` is the staff member taking the order (recorded in the log).
+        """
+        async with async_unit_of_work(db):
+            coverable = self._coverable_lines(order_data, owner)
+            granted = await usage_repo.claim_async(db, owner.id, self._wanted_uses(order_data, coverable), MONTHLY_SERVICE_LIMIT)
+            covered = self._covered_lines(order_data, coverable, granted)
+            order_items, total_cost, is_fully_covered = self._build_items(order_data, covered)
+
+            db_order = Order(owner_id=owner.id, payment_status="unpaid")
+            self._apply_totals(db_order, total_cost, is_fully_covered)
+            db_order.items = order_items
+            db_order.active_item_count = sum(item.status != FINAL_STATUS for item in order_items)
+            await order_repo.add_async(db, db_order)
+            await rollup_repo.add_async(db, self._order_rollup(order_items, covered, db_order.payment_status == "paid"))
+            await history_repo.add_async(db, self._initial_transitions(order_items, actor_id))
+
+        if any(covered):
+            principal_cache.invalidate_user(owner.id)
+        # items were assigned through the relationship, so they are already loaded
+        return db_order
+
+    async def process_payment_async(self, db: AsyncSession, order_id: str, user_id: str):
+        order = await order_repo.get_by_id_async(db, order_id)
+        self._check_payable(order, user_id)
+
+        if order.payment_status != "paid":
+            await rollup_repo.add_async(db, self._payment_rollup(order))
+        order.payment_status = "paid"
+        await order_repo.touch_orders_async(db, {order.id: 0})
+        self._queue_payment_event(db, order)
+        await db.commit()
+        return order
+
+    async def update_item_status_async(self, db: AsyncSession, item_id: str, new_status: str, actor_id: Optional[str] = None):
+        item = await order_repo.get_item_by_id_async(db, item_id)
+        self._check_status(item, new_status)
+
+        now = datetime.now(timezone.utc)
+        await order_repo.touch_orders_async(db, {item.order_id: self._active_delta(item.status, new_status)})
+        await rollup_repo.add_async(db, self._completion_rollup([(item.service_name, item.status, new_status)]))
+        await history_repo.add_async(db, [transition_row(item.id, item.service_name, item.status, new_status, now, actor_id, item.status_changed_at)])
+        item.status = new_status
+        item.status_changed_at = now
+        self._queue_status_email(db, item, new_status)
+        self._queue_item_event(db, item.order.owner_id, item.order_id, item.id, item.service_name, new_status)
+        await db.commit()
+
         return item
 
-order_service = OrderService()
\ No newline at end of file
+    async def update_item_statuses_async(self, db: AsyncSession, updates: list[ItemStatusChange], actor_id: Optional[str] = None) -> list[ItemStatusResult]:
+        """
+        Batch variant of update_item_status_async: invalid items are reported and
+        skipped, valid ones are applied with one UPDATE in one transaction.
+        """
+        async with async_unit_of_work(db):
+            rows = await order_repo.get_status_rows_async(db, list({change.item_id for change in updates}))
+            results, new_statuses, active_deltas, changes_by_email, events = self._plan_status_batch(rows, updates)
+            now = datetime.now(timezone.utc)
+            await order_repo.set_statuses_async(db, new_statuses, now)
+            await order_repo.touch_orders_async(db, active_deltas)
+            await rollup_repo.add_async(db, self._completion_rollup(
+                (row.service_name, row.status, new_statuses[row.id]) for row in rows if row.id in new_statuses
+            ))
+            await history_repo.add_async(db, self._batch_transitions(rows, new_statuses, now, actor_id))
+            self._queue_batch_emails(db, changes_by_email)
+            for item_event in events:
+                self._queue_item_event(db, *item_event)
+        return results
+
+order_service = OrderService()
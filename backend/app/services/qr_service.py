@@ -0,0 +1,49 @@
+# app/services/qr_service.py
+import hashlib
+import json
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.http_cache import BodyCache, CachedBody, strong_etag
+from app.schemas.utils import render_qr
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Rendered images are plain cached bodies (bytes + strong ETag + media type)
+QRImage = CachedBody
+
+class QRService:
+    """Renders QR codes on demand, in memory, cached by payload hash."""
+
+    def __init__(self, cache: BodyCache):
+        self.cache = cache
+
+    @staticmethod
+    def payload_key(data: dict, fmt: str) -> str:
+        canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        return f"{fmt}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    def _render(self, data: dict, fmt: str) -> QRImage:
+        content = render_qr(data, fmt)
+        return QRImage(content, strong_etag(content), QR_MEDIA_TYPES[fmt])
+
+    async def get(self, data: dict, fmt: str = "png") -> QRImage:
+        key = self.payload_key(data, fmt)
+        image = self.cache.get(key)
+        if image is None:
+            # PIL rendering is CPU work; keep it off the event loop
+            image = await run_in_threadpool(self._render, data, fmt)
+            self.cache.put(key, image)
+        return image
+
+    # --- URLs handed to clients ---
+    @staticmethod
+    def order_qr_url(order_id: str, fmt: str = "png") -> str:
+        return f"/qr/orders/{order_id}.{fmt}"
+
+    @staticmethod
+    def user_qr_url(user_id: str, fmt: str = "png") -> str:
+        return f"/qr/users/{user_id}.{fmt}"
+
+qr_service = QRService(BodyCache(settings.QR_CACHE_MAX_BYTES))
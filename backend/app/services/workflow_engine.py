@@ -0,0 +1,88 @@
+# app/services/workflow_engine.py
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas import SERVICE_WORKFLOWS, SERVICE_EXTRA_TRANSITIONS
+
+NO_STATUSES: Tuple[str, ...] = ()
+
+class CompiledWorkflow:
+    """
+    One service workflow compiled to dense state IDs.
+    For every state the allowed targets are precomputed both as a set (for
+    validation) and as an ordered tuple (served as possible_next_statuses).
+    """
+    __slots__ = ("service_name", "states", "state_ids", "next_states", "allowed")
+
+    def __init__(
+        self,
+        service_name: str,
+        states: List[str],
+        allow_skip: bool = True,
+        extra_transitions: Iterable[Tuple[str, str]] = (),
+    ):
+        self.service_name = service_name
+        self.states: Tuple[str, ...] = tuple(states)
+        self.state_ids: Dict[str, int] = {state: i for i, state in enumerate(self.states)}
+
+        targets = [set() for _ in self.states]
+        for i in range(len(self.states) - 1):
+            # Forward only: either straight to the next stage or (with skip) any later one
+            last = len(self.states) if allow_skip else i + 2
+            targets[i].update(range(i + 1, last))
+        for source, target in extra_transitions:
+            targets[self.state_ids[source]].add(self.state_ids[target])
+
+        self.next_states: Tuple[Tuple[str, ...], ...] = tuple(
+            tuple(self.states[j] for j in sorted(ids)) for ids in targets
+        )
+        self.allowed: Tuple[frozenset, ...] = tuple(frozenset(names) for names in self.next_states)
+
+class WorkflowEngine:
+    def __init__(
+        self,
+        workflows: Dict[str, List[str]],
+        allow_skip: bool = True,
+        extra_transitions: Optional[Dict[str, List[Tuple[str, str]]]] = None,
+    ):
+        extra_transitions = extra_transitions or {}
+        self._workflows: Dict[str, CompiledWorkflow] = {
+            name: CompiledWorkflow(name, states, allow_skip, extra_transitions.get(name, ()))
+            for name, states in workflows.items()
+        }
+        # Changes whenever any transition does (part of order ETags)
+        transitions = sorted((name, w.next_states) for name, w in self._workflows.items())
+        self.fingerprint = hashlib.sha256(repr(transitions).encode()).hexdigest()[:12]
+
+    def get(self, service_name: str) -> Optional[CompiledWorkflow]:
+        return self._workflows.get(service_name)
+
+    def initial_status(self, service_name: str) -> str:
+        workflow = self._workflows.get(service_name)
+        return workflow.states[0] if workflow else "pending"
+
+    def next_statuses(self, service_name: str, status: str) -> Tuple[str, ...]:
+        """Statuses reachable from `status` (a shared, precomputed tuple)."""
+        workflow = self._workflows.get(service_name)
+        if workflow is None:
+            return NO_STATUSES
+        state_id = workflow.state_ids.get(status)
+        if state_id is None:
+            return NO_STATUSES
+        return workflow.next_states[state_id]
+
+    def can_transition(self, service_name: str, current: str, new: str) -> bool:
+        workflow = self._workflows.get(service_name)
+        if workflow is None:
+            return False
+        state_id = workflow.state_ids.get(current)
+        if state_id is None:
+            return False
+        return new in workflow.allowed[state_id]
+
+workflow_engine = WorkflowEngine(
+    SERVICE_WORKFLOWS,
+    allow_skip=settings.WORKFLOW_ALLOW_SKIP,
+    extra_transitions=SERVICE_EXTRA_TRANSITIONS
+)
@@ -0,0 +1,55 @@
+# app/testing/pytest_plugin.py
+"""
+pytest plugin for query budgets (see app.core.query_budget). Enable it with
+`pytest -p app.testing.pytest_plugin` or `pytest_plugins = ["app.testing.pytest_plugin"]`
+in a conftest.py.
+
+    --query-budgets          fail requests over their budget in query_budgets.json
+    --update-query-budgets   rewrite query_budgets.json from what the tests issued
+    --strict-loading         lazy loads raise instead of querying
+
+    @pytest.mark.query_budget(4)   # the whole test may issue at most 4 statements
+    def test_scan(client): ...
+
+    def test_service(count_queries):
+        with count_queries() as stats:
+            ...
+"""
+from contextlib import nullcontext
+
+import pytest
+
+from app.core.query_budget import count_queries as _count_queries, endpoint_budgets, query_budget, strict_loading
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query-budget")
+    group.addoption("--query-budgets", action="store_true", help="enforce the per-endpoint budgets in query_budgets.json")
+    group.addoption("--update-query-budgets", action="store_true", help="record the queries each endpoint issued into query_budgets.json")
+    group.addoption("--strict-loading", action="store_true", help="turn lazy relationship loads into errors")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(max_queries): fail the test if it issues more SQL statements")
+    if config.getoption("--update-query-budgets"):
+        endpoint_budgets.enable()
+        # Only record: the point is to find the new numbers
+        endpoint_budgets.budgets = {}
+    elif config.getoption("--query-budgets"):
+        endpoint_budgets.enable()
+
+def pytest_unconfigure(config):
+    if config.getoption("--update-query-budgets"):
+        endpoint_budgets.load()
+        endpoint_budgets.save()
+    endpoint_budgets.disable()
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    with strict_loading() if item.config.getoption("--strict-loading") else nullcontext():
+        with query_budget(marker.args[0], item.nodeid) if marker else nullcontext():
+            return (yield)
+
+@pytest.fixture
+def count_queries():
+    """The count_queries context manager, for asserting on a single call."""
+    return _count_queries
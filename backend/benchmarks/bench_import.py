@@ -0,0 +1,130 @@
+# benchmarks/bench_import.py
+"""
+Cold-start benchmark: imports app.main in fresh interpreters under
+`python -X importtime` and reports the import time, the packages it is spent
+in, and any heavy dependency that should only load on first use. Results are
+written as JSON to benchmarks/results/ and compared against a stored baseline
+(exit code 1 on a regression or an eagerly imported lazy dependency).
+
+    python -m benchmarks.bench_import                    # 7 runs, median reported
+    python -m benchmarks.bench_import --runs 15 --top 25
+    python -m benchmarks.bench_import --save-baseline    # accept these numbers
+
+Baselines are only comparable on the same machine and Python.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline_import.json")
+# Per-run results (git-ignored); baselines are the checked-in reference
+DEFAULT_OUTPUT = os.path.join(BACKEND_DIR, "benchmarks", "results", "bench_import.json")
+
+# Loaded on first use inside the app; importing app.main must not pull them in
+LAZY_MODULES = ("qrcode", "PIL", "requests", "authlib", "httpx", "passlib", "alembic")
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """{module: (self_us, cumulative_us)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def run_once(env: dict) -> tuple[float, dict[str, tuple[int, int]]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def by_package(modules: dict[str, tuple[int, int]]) -> dict[str, float]:
+    """Self time per top-level package, in ms (app.* is kept per module group)."""
+    totals: dict[str, int] = {}
+    for name, (self_us, _) in modules.items():
+        parts = name.split(".")
+        package = ".".join(parts[:2]) if parts[0] == "app" else parts[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return {package: round(us / 1000, 2) for package, us in sorted(totals.items(), key=lambda item: -item[1])}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results (default: benchmarks/results/)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    env.setdefault("SECRET_KEY", "bench")
+    # Never touched by the import itself; set so settings validate
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import.db')}")
+
+    # One unmeasured run so .pyc files exist (containers ship them prebuilt)
+    run_once(env)
+    runs = [run_once(env) for _ in range(args.runs)]
+    seconds = sorted(elapsed for elapsed, _ in runs)
+    median = statistics.median(seconds)
+    # Package breakdown from the run closest to the median
+    _, modules = min(runs, key=lambda run: abs(run[0] - median))
+    packages = by_package(modules)
+    eager = sorted({name.split(".")[0] for name in modules if name.split(".")[0] in LAZY_MODULES})
+
+    print(f"import app.main: median {median * 1000:.1f} ms, min {seconds[0] * 1000:.1f} ms, max {seconds[-1] * 1000:.1f} ms ({args.runs} runs, {len(modules)} modules)")
+    for package, ms in list(packages.items())[:args.top]:
+        print(f"  {package:<32} {ms:>8.2f} ms")
+    for name in eager:
+        print(f"  ❌ {name} is imported eagerly (it should load on first use)")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+        },
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(seconds[0] * 1000, 2),
+        "modules": len(modules),
+        "eager_lazy_modules": eager,
+        "packages_ms": packages,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 1 if eager else 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline} (run with --save-baseline to create one)")
+        return 1 if eager else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in ("python", "machine"):
+        if baseline.get("meta", {}).get(key) != results["meta"][key]:
+            print(f"⚠️  {key} differs from the baseline; numbers may not be comparable")
+    change = median * 1000 / baseline["median_ms"] - 1 if baseline.get("median_ms") else 0.0
+    regressed = change > args.tolerance
+    print(f"{'❌' if regressed else '✅'} vs. baseline ({baseline['meta'].get('timestamp', '?')}): median {change:+.1%}, modules {len(modules) - baseline.get('modules', 0):+d}")
+    return 1 if regressed or eager else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# benchmarks/bench_labels.py
+"""
+Bulk label printing: the old per-order `generate_qr` (one PNG file on disk per
+order, rendered sequentially) vs. label_service (sheets rendered in a process pool).
+
+    python -m benchmarks.bench_labels --orders 500 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+def bench_sequential(order_ids) -> float:
+    from app.schemas.utils import generate_qr
+
+    start = time.perf_counter()
+    for order_id in order_ids:
+        generate_qr({"order_id": order_id}, f"{order_id}.png")
+    return time.perf_counter() - start
+
+async def _drain(stream) -> int:
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+    return size
+
+def bench_sheets(order_ids, workers: int, fmt: str) -> tuple[float, int]:
+    from app.services.label_service import LabelService
+
+    service = LabelService(workers)
+    # Warm the pool so process start-up isn't counted
+    asyncio.run(_drain(service.stream_png_zip(order_ids[:1])))
+    stream = service.stream_pdf if fmt == "pdf" else service.stream_png_zip
+
+    start = time.perf_counter()
+    size = asyncio.run(_drain(stream(order_ids)))
+    elapsed = time.perf_counter() - start
+    service.shutdown()
+    return elapsed, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=210)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--format", choices=["pdf", "png"], default="pdf")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    order_ids = [str(uuid.uuid4()) for _ in range(args.orders)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sequential = bench_sequential(order_ids)
+        sheets, size = bench_sheets(order_ids, args.workers, args.format)
+
+    print(f"orders={args.orders} workers={args.workers} format={args.format}")
+    print(f"sequential generate_qr: {sequential:7.2f}s  ({args.orders / sequential:7.1f} labels/s)")
+    print(f"label sheets:           {sheets:7.2f}s  ({args.orders / sheets:7.1f} labels/s, {size / 1024:.0f} KiB)")
+    print(f"speedup: {sequential / sheets:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_order_serialization.py
+"""
+Order list serialization: the ORM path (hydrate Order/OrderItem objects,
+enrich_order_response, Pydantic from_attributes) vs. the projection fast path
+(row tuples -> encode_order_rows -> orjson), on the same page of orders.
+
+    python -m benchmarks.bench_order_serialization --orders 2000 --items 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp()
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}")
+sys.path.insert(0, BACKEND_DIR)
+
+def seed(orders: int, items: int):
+    from app.db.models import Order, OrderItem, User
+    from app.db.session import SessionLocal
+    from app.schemas import SERVICE_WORKFLOWS
+
+    rng = random.Random(42)
+    with SessionLocal() as db:
+        owner = User(username="bench", email="bench@example.com", role="customer")
+        db.add(owner)
+        db.flush()
+        for _ in range(orders):
+            order = Order(owner_id=owner.id, total_cost=rng.choice([0.0, 25.0, 80.0]), payment_status="unpaid")
+            for _ in range(items):
+                service_name = rng.choice(list(SERVICE_WORKFLOWS))
+                order.items.append(OrderItem(
+                    service_name=service_name,
+                    quantity=rng.randint(1, 5),
+                    cost=10.0,
+                    status=rng.choice(SERVICE_WORKFLOWS[service_name]),
+                ))
+            db.add(order)
+        db.commit()
+
+async def orm_path(db, limit: int) -> bytes:
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app.api.orders import enrich_order_response
+    from app.repositories.order_repo import order_repo
+    from app.schemas import OrderResponse
+
+    orders, _ = await order_repo.list_page_async(db, limit=limit)
+    # What FastAPI does with response_model=List[OrderResponse]
+    validated = TypeAdapter(List[OrderResponse]).validate_python([enrich_order_response(o) for o in orders], from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+async def projection_path(db, limit: int) -> bytes:
+    from app.api.orders import encode_order_rows
+    from app.repositories.order_repo import order_repo
+
+    orders, items, _ = await order_repo.list_page_rows_async(db, limit=limit)
+    return encode_order_rows(orders, items)
+
+def _canonical(body: bytes):
+    # Item order within an order is unspecified on both paths
+    orders = json.loads(body)
+    for order in orders:
+        order["items"].sort(key=lambda item: item["id"])
+    return orders
+
+async def run(limit: int, repeat: int):
+    from app.db.session import AsyncSessionLocal, async_engine
+
+    results = {}
+    for name, path in (("orm", orm_path), ("projection", projection_path)):
+        timings = []
+        for _ in range(repeat):
+            # Fresh session each run, as per request (empty identity map)
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                body = await path(db, limit)
+                timings.append(time.perf_counter() - start)
+        results[name] = (min(timings), body)
+    await async_engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000, help="orders in the page (and in the database)")
+    parser.add_argument("--items", type=int, default=3, help="items per order")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from tools.explain_queries import migrate
+
+    migrate(os.environ["DATABASE_URL"])
+    seed(args.orders, args.items)
+    results = asyncio.run(run(args.orders, args.repeat))
+
+    orm_time, orm_body = results["orm"]
+    fast_time, fast_body = results["projection"]
+    assert _canonical(orm_body) == _canonical(fast_body), "paths disagree"
+
+    print(f"orders={args.orders} items/order={args.items} (best of {args.repeat}, database included)")
+    print(f"ORM + Pydantic:     {orm_time * 1000:8.1f} ms")
+    print(f"projection + orjson:{fast_time * 1000:8.1f} ms")
+    print(f"speedup: {orm_time / fast_time:.1f}x, identical JSON ({len(fast_body) / 1024:.0f} KiB)")
+
+if __name__ == "__main__":
+    main()
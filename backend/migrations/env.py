@@ -0,0 +1,53 @@
+# migrations/env.py
+import logging
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, pool
+
+from app.core.config import settings
+from app.db.models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    # Tools and tests migrate in-process; keep the app's loggers working
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+logger = logging.getLogger("alembic.env")
+
+target_metadata = Base.metadata
+
+# Databases from before migrations were built by Base.metadata.create_all at
+# startup: they hold the 0001 schema but have no alembic_version table
+LEGACY_REVISION = "0001"
+
+def _url() -> str:
+    # An explicit URL (e.g. tools/explain_queries.py) wins over app settings
+    return config.get_main_option("sqlalchemy.url") or settings.SQLALCHEMY_DATABASE_URI
+
+def run_migrations_offline():
+    """Emit SQL to stdout (`alembic upgrade head --sql`)."""
+    context.configure(url=_url(), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def _adopt_legacy_schema(connection):
+    """Stamps a create_all database as 0001 so `upgrade head` continues from there."""
+    tables = inspect(connection).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        logger.warning("Found an unversioned schema (built by create_all), stamping it as %s", LEGACY_REVISION)
+        context.get_context().stamp(ScriptDirectory.from_config(config), LEGACY_REVISION)
+
+def run_migrations_online():
+    connectable = create_engine(_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            _adopt_legacy_schema(connection)
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,65 @@
+"""Initial schema (what Base.metadata.create_all used to build at startup)
+
+Databases created before migrations existed already have these tables:
+migrations/env.py stamps them as 0001 on their first `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+membership_plan = sa.Enum("none", "standard", "premium", name="membershipplanenum")
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False, unique=True),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("password", sa.String(255), nullable=True),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("google_id", sa.String(255), nullable=True),
+        sa.Column("membership_plan", membership_plan, nullable=True),
+        sa.Column("membership_expiry_date", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("monthly_services_used", sa.JSON(), nullable=True),
+        sa.Column("static_qr_codes", sa.JSON(), nullable=True),
+        sa.Column("reset_token", sa.String(255), nullable=True),
+        sa.Column("reset_token_expiry", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_google_id", "users", ["google_id"], unique=True)
+    op.create_index("ix_users_reset_token", "users", ["reset_token"], unique=True)
+
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("owner_id", sa.String(36), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("total_cost", sa.Float(), nullable=True),
+        sa.Column("payment_status", sa.String(20), nullable=True),
+        sa.Column("is_covered_by_plan", sa.Boolean(), nullable=True),
+        sa.Column("qr_code_path", sa.String(255), nullable=True),
+    )
+
+    op.create_table(
+        "order_items",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("order_id", sa.String(36), sa.ForeignKey("orders.id"), nullable=True),
+        sa.Column("service_name", sa.String(100), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(50), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("order_items")
+    op.drop_table("orders")
+    op.drop_table("users")
+    membership_plan.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""Notification outbox (emails written with the change they announce, drained by the worker)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("email_to", sa.String(100), nullable=False),
+        sa.Column("subject", sa.String(255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # The worker's claim: WHERE status = 'pending' AND next_attempt_at <= now
+    op.create_index("ix_notification_outbox_due", "notification_outbox", ["status", "next_attempt_at"])
+
+def downgrade():
+    op.drop_table("notification_outbox")
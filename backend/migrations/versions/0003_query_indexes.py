@@ -0,0 +1,29 @@
+"""Indexes matched to the repository queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Customer order pages: WHERE owner_id = ? ORDER BY created_at DESC, id DESC
+    op.create_index(
+        "ix_orders_owner_id_created_at", "orders",
+        ["owner_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    # Staff order pages and keyset cursors
+    op.create_index("ix_orders_created_at", "orders", [sa.text("created_at DESC"), sa.text("id DESC")])
+    # Item loading (order_id IN ...) and the status filter (EXISTS ... AND status = ?)
+    op.create_index("ix_order_items_order_id_status", "order_items", ["order_id", "status"])
+
+def downgrade():
+    op.drop_index("ix_order_items_order_id_status", table_name="order_items")
+    op.drop_index("ix_orders_created_at", table_name="orders")
+    op.drop_index("ix_orders_owner_id_created_at", table_name="orders")
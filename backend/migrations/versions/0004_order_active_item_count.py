@@ -0,0 +1,36 @@
+"""Denormalized active_item_count on orders, with a partial index for active orders
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("orders", sa.Column("active_item_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # Backfill: items that have not reached the final status ("picked_up")
+    op.execute(
+        "UPDATE orders SET active_item_count = ("
+        " SELECT COUNT(order_items.id) FROM order_items"
+        " WHERE order_items.order_id = orders.id AND order_items.status != 'picked_up'"
+        ")"
+    )
+
+    op.create_index(
+        "ix_orders_owner_id_active", "orders",
+        ["owner_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        postgresql_where=sa.text("active_item_count > 0"),
+        sqlite_where=sa.text("active_item_count > 0"),
+    )
+
+def downgrade():
+    op.drop_index("ix_orders_owner_id_active", table_name="orders")
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.drop_column("active_item_count")
@@ -0,0 +1,71 @@
+"""Move plan usage from users.monthly_services_used into a service_usage ledger
+
+Existing counters are carried over into the current month.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Carry existing counters into the current month, expanding the JSON in SQL
+# (also works for offline `alembic upgrade --sql`)
+CARRY_OVER = {
+    "postgresql": (
+        "INSERT INTO service_usage (user_id, period, service_name, count) "
+        "SELECT users.id, '{period}', usage.key, usage.value::int "
+        "FROM users, json_each_text(users.monthly_services_used::json) AS usage "
+        "WHERE users.monthly_services_used IS NOT NULL AND usage.value::int > 0"
+    ),
+    "sqlite": (
+        "INSERT INTO service_usage (user_id, period, service_name, count) "
+        "SELECT users.id, '{period}', usage.key, CAST(usage.value AS INTEGER) "
+        "FROM users, json_each(users.monthly_services_used) AS usage "
+        "WHERE users.monthly_services_used IS NOT NULL AND CAST(usage.value AS INTEGER) > 0"
+    ),
+}
+
+def _period() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+def upgrade():
+    op.create_table(
+        "service_usage",
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("period", sa.String(7), primary_key=True),
+        sa.Column("service_name", sa.String(100), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+    carry_over = CARRY_OVER.get(op.get_context().dialect.name)
+    if carry_over:
+        op.execute(carry_over.format(period=_period()))
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("monthly_services_used")
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("monthly_services_used", sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    usage: dict = {}
+    rows = conn.execute(
+        sa.text("SELECT user_id, service_name, count FROM service_usage WHERE period = :period"),
+        {"period": _period()},
+    )
+    for user_id, service_name, count in rows:
+        usage.setdefault(user_id, {})[service_name] = count
+    users = sa.table("users", sa.column("id", sa.String), sa.column("monthly_services_used", sa.JSON))
+    for user_id, services in usage.items():
+        conn.execute(users.update().where(users.c.id == user_id).values(monthly_services_used=services))
+
+    op.drop_table("service_usage")
@@ -0,0 +1,54 @@
+"""Daily revenue and throughput rollups per service (read by /reports)
+
+Existing orders are backfilled. Payment and pickup times were never recorded,
+so historical paid revenue and completed items are bucketed by order day.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+DAY_OF = {
+    "postgresql": "CAST(orders.created_at AS DATE)",
+    "sqlite": "date(orders.created_at)",
+}
+
+BACKFILL = (
+    "INSERT INTO daily_service_rollups "
+    "(day, service_name, items_ordered, quantity, covered_items, billed, paid_revenue, items_completed) "
+    "SELECT {day}, order_items.service_name, COUNT(*), SUM(order_items.quantity), "
+    "SUM(CASE WHEN order_items.cost = 0 THEN 1 ELSE 0 END), "  # covered lines are free, others never are
+    "SUM(order_items.cost), "
+    "SUM(CASE WHEN orders.payment_status = 'paid' THEN order_items.cost ELSE 0 END), "
+    "SUM(CASE WHEN order_items.status = 'picked_up' THEN 1 ELSE 0 END) "
+    "FROM order_items JOIN orders ON orders.id = order_items.order_id "
+    "WHERE orders.created_at IS NOT NULL "
+    "GROUP BY {day}, order_items.service_name"
+)
+
+def upgrade():
+    op.create_table(
+        "daily_service_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("service_name", sa.String(100), primary_key=True),
+        sa.Column("items_ordered", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("covered_items", sa.Integer(), nullable=False),
+        sa.Column("billed", sa.Float(), nullable=False),
+        sa.Column("paid_revenue", sa.Float(), nullable=False),
+        sa.Column("items_completed", sa.Integer(), nullable=False),
+    )
+
+    day = DAY_OF.get(op.get_context().dialect.name)
+    if day:
+        op.execute(BACKFILL.format(day=day))
+
+def downgrade():
+    op.drop_table("daily_service_rollups")
@@ -0,0 +1,45 @@
+"""Item status history log and status_changed_at on items (stage durations, ETAs)
+
+Items still in their initial status are assumed to have entered it when the
+order was created; for the others the time is unknown and stays NULL.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("order_items", sa.Column("status_changed_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE order_items SET status_changed_at = ("
+        " SELECT orders.created_at FROM orders WHERE orders.id = order_items.order_id"
+        ") WHERE status = 'pending'"
+    )
+
+    op.create_table(
+        "item_status_transitions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("item_id", sa.String(36), sa.ForeignKey("order_items.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("service_name", sa.String(100), nullable=False),
+        sa.Column("from_status", sa.String(50), nullable=True),
+        sa.Column("to_status", sa.String(50), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("changed_by", sa.String(36), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("stage_seconds", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_item_status_transitions_item_id", "item_status_transitions", ["item_id", "id"])
+    op.create_index("ix_item_status_transitions_changed_at", "item_status_transitions", ["changed_at"])
+
+def downgrade():
+    op.drop_index("ix_item_status_transitions_changed_at", table_name="item_status_transitions")
+    op.drop_index("ix_item_status_transitions_item_id", table_name="item_status_transitions")
+    op.drop_table("item_status_transitions")
+    with op.batch_alter_table("order_items") as batch_op:
+        batch_op.drop_column("status_changed_at")
@@ -0,0 +1,32 @@
+"""orders.created_at as timestamptz (like every later datetime column)
+
+Existing values were written as UTC, so they are converted as UTC. SQLite
+has no time zone types; nothing changes there.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.alter_column(
+            "orders", "created_at",
+            type_=sa.DateTime(timezone=True), existing_type=sa.DateTime(), existing_nullable=True,
+            postgresql_using="created_at AT TIME ZONE 'UTC'",
+        )
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.alter_column(
+            "orders", "created_at",
+            type_=sa.DateTime(), existing_type=sa.DateTime(timezone=True), existing_nullable=True,
+            postgresql_using="created_at AT TIME ZONE 'UTC'",
+        )
@@ -0,0 +1,28 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so point the app at a scratch database first
+_DB_PATH = os.path.join(tempfile.mkdtemp(), "tests.db")
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ.setdefault("NOTIFY_WORKER_ENABLED", "false")
+os.environ.setdefault("ETA_ENABLED", "false")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pytest
+
+# The query-budget options (--query-budgets, --strict-loading, ...); see app/testing/pytest_plugin.py
+pytest_plugins = ["app.testing.pytest_plugin"]
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_db():
+    from tools.explain_queries import migrate
+
+    migrate(os.environ["DATABASE_URL"])
+    yield
+    from app.db.session import engine
+
+    engine.dispose()
@@ -0,0 +1,36 @@
+# tests/test_admission.py
+import pytest
+
+from app.core.admission import AdmissionController
+from app.core.config import settings
+
+@pytest.fixture
+def controller():
+    return AdmissionController(settings.ADMISSION_LIMITS)
+
+@pytest.mark.parametrize(
+    ("method", "path", "expected"),
+    [
+        # Counter scanners
+        ("GET", "/orders/qr/3f2c", "scan"),
+        ("GET", "/qr/orders/3f2c.png", "scan"),
+        ("PUT", "/orders/items/status", "scan"),
+        ("PUT", "/orders/items/7a1b/status", "scan"),
+        # Same paths, other methods or longer paths: not scanner writes
+        ("GET", "/orders/items/7a1b/history", "api"),
+        ("POST", "/orders/items/status", "api"),
+        ("PUT", "/orders/items/7a1b/status/extra", "api"),
+        ("PUT", "/orders/3f2c/pay", "api"),
+        ("POST", "/orders/", "api"),
+        ("POST", "/auth/login", "auth"),
+        ("GET", "/orders/export", "reporting"),
+        ("GET", "/users/me", "api"),
+        ("GET", "/users/", "admin"),
+    ],
+)
+def test_route_classes(controller, method, path, expected):
+    assert controller.classify(method, path).name == expected
+
+def test_streams_and_metrics_are_exempt(controller):
+    assert controller.classify("GET", "/events/stream") is None
+    assert controller.classify("GET", "/internal/metrics") is None
@@ -0,0 +1,80 @@
+# tests/test_eta_service.py
+"""
+The ETA aggregator's tail of item_status_transitions: entries whose
+transaction commits after a higher id was already read are still counted,
+once each.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.models import ItemStatusTransition
+from app.db.session import SessionLocal, async_engine
+from app.services.eta_service import EtaService
+
+def samples(eta: EtaService, service_name: str) -> int:
+    histogram = eta._histograms.get((service_name, "washing"))
+    return histogram.total if histogram else 0
+
+def row(transition_id: int, service_name: str) -> tuple:
+    return transition_id, service_name, "washing", 60.0
+
+def test_ingest_counts_late_entries_once():
+    eta = EtaService()
+    eta.ingest([row(1, "wash_and_fold"), row(2, "wash_and_fold"), row(5, "wash_and_fold")])
+    assert samples(eta, "wash_and_fold") == 3
+    assert sorted(eta._gaps) == [3, 4]
+
+    # 4 commits late; 5 is read again (a retried batch): only 4 counts
+    eta.ingest([row(4, "wash_and_fold"), row(5, "wash_and_fold")])
+    assert samples(eta, "wash_and_fold") == 4
+    assert sorted(eta._gaps) == [3]
+    assert eta.stats()["last_transition_id"] == 5
+
+def test_skipped_ids_are_given_up_after_a_while():
+    eta = EtaService()
+    eta.ingest([row(1, "wash_and_fold"), row(3, "wash_and_fold")])
+    skipped_at = eta._gaps[2]
+
+    eta._expire_gaps(skipped_at + settings.ETA_GAP_SECONDS - 1)
+    assert list(eta._gaps) == [2]
+    eta._expire_gaps(skipped_at + settings.ETA_GAP_SECONDS)
+    assert eta._gaps == {}
+
+def test_poll_picks_up_late_commits():
+    service_name = f"eta-test-{uuid.uuid4().hex[:8]}"
+
+    def log(transition_id: int):
+        with SessionLocal() as db:
+            db.add(ItemStatusTransition(
+                id=transition_id, item_id=str(uuid.uuid4()), service_name=service_name,
+                from_status="washing", to_status="drying", changed_at=datetime.now(timezone.utc), stage_seconds=60.0,
+            ))
+            db.commit()
+
+    def poll(eta: EtaService):
+        async def run():
+            try:
+                await eta.poll_once()
+            finally:
+                await async_engine.dispose()
+        asyncio.run(run())
+
+    with SessionLocal() as db:
+        base = (db.execute(select(func.max(ItemStatusTransition.id))).scalar() or 0) + 100
+    eta = EtaService()
+    log(base)
+    poll(eta)
+    # base + 2 commits while base + 1 is still open
+    log(base + 2)
+    poll(eta)
+    assert samples(eta, service_name) == 2
+
+    log(base + 1)
+    poll(eta)
+    poll(eta)
+    assert samples(eta, service_name) == 3
+    assert base + 1 not in eta._gaps
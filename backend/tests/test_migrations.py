@@ -0,0 +1,40 @@
+# tests/test_migrations.py
+"""
+Databases built by Base.metadata.create_all before migrations existed have
+no alembic_version table; `alembic upgrade head` adopts them as 0001.
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def alembic_config(url: str) -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+def test_upgrade_adopts_unversioned_schema(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    config = alembic_config(url)
+    # The 0001 tables without the version table: what create_all used to leave behind
+    command.upgrade(config, "0001")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE alembic_version"))
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, password, role, membership_plan) "
+            "VALUES ('u1', 'legacy', 'legacy@example.com', 'x', 'customer', 'none')"
+        ))
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == ScriptDirectory.from_config(config).get_current_head()
+        assert conn.execute(text("SELECT username FROM users")).scalars().all() == ["legacy"]
+    assert "item_status_transitions" in inspect(engine).get_table_names()
+    engine.dispose()
@@ -0,0 +1,158 @@
+# tests/test_notification_worker.py
+"""
+The notification worker against tools/fake_mailgun.py (served in-process
+through httpx.ASGITransport): delivery, retries with backoff, dead-lettering,
+and messages staying pending while Mailgun is not configured.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.db.models import NotificationOutbox
+from app.db.session import SessionLocal, async_engine
+from app.services.notification_service import notification_service
+from app.services.notification_worker import NotificationWorker
+from tools.fake_mailgun import create_app
+
+BACKOFF_BASE = 10.0
+
+@pytest.fixture(autouse=True)
+def mailgun(monkeypatch):
+    monkeypatch.setattr(settings, "MAILGUN_API_KEY", "key-test")
+    monkeypatch.setattr(settings, "MAILGUN_DOMAIN", "mg.washwise.test")
+    monkeypatch.setattr(settings, "MAILGUN_API_BASE", "http://mailgun.test/v3")
+    monkeypatch.setattr(settings, "NOTIFY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "NOTIFY_BACKOFF_BASE", BACKOFF_BASE)
+    monkeypatch.setattr(settings, "NOTIFY_BACKOFF_MAX", 900.0)
+    with SessionLocal() as db:
+        db.query(NotificationOutbox).delete()
+        db.commit()
+
+def enqueue(email_to: str = "customer@washwise.test") -> str:
+    with SessionLocal() as db:
+        message = notification_service.enqueue_email(db, email_to, "Order Update", "<b>ready</b>")
+        db.commit()
+        return message.id
+
+def load(message_id: str) -> NotificationOutbox:
+    with SessionLocal() as db:
+        return db.get(NotificationOutbox, message_id)
+
+def make_due(message_id: str):
+    with SessionLocal() as db:
+        db.get(NotificationOutbox, message_id).next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+
+def retry_delay(row: NotificationOutbox) -> float:
+    # SQLite hands back naive datetimes
+    next_attempt_at = row.next_attempt_at.replace(tzinfo=timezone.utc)
+    return (next_attempt_at - datetime.now(timezone.utc)).total_seconds()
+
+def drain(fake_mailgun) -> int:
+    """One worker pass against the fake API; returns how many messages it handled."""
+    async def run():
+        worker = NotificationWorker()
+        # What start() would open, minus the background polling loop
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_mailgun)) as client:
+            worker._client = client
+            try:
+                return await worker.drain_once()
+            finally:
+                await async_engine.dispose()
+    return asyncio.run(run())
+
+def accepted(fake_mailgun) -> list[dict]:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_mailgun), base_url="http://mailgun.test") as client:
+            return (await client.get("/messages")).json()
+    return asyncio.run(run())
+
+def test_delivers_pending_message():
+    fake = create_app()
+    message_id = enqueue()
+
+    assert drain(fake) == 1
+    row = load(message_id)
+    assert (row.status, row.attempts, row.last_error) == ("sent", 1, None)
+    assert row.sent_at is not None
+    [sent] = accepted(fake)
+    assert (sent["to"], sent["subject"], sent["domain"]) == ("customer@washwise.test", "Order Update", "mg.washwise.test")
+
+    # Nothing left to do
+    assert drain(fake) == 0
+
+def test_retries_transient_failures_with_backoff():
+    failing = create_app(fail_rate=1.0)
+    message_id = enqueue()
+
+    assert drain(failing) == 1
+    row = load(message_id)
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert row.last_error.startswith("HTTP 503")
+    # Jittered into [50%, 100%] of BACKOFF_BASE * 2 ** (attempts - 1)
+    assert BACKOFF_BASE * 0.5 - 1 <= retry_delay(row) <= BACKOFF_BASE
+    # Not due yet
+    assert drain(failing) == 0
+
+    make_due(message_id)
+    assert drain(failing) == 1
+    row = load(message_id)
+    assert (row.status, row.attempts) == ("pending", 2)
+    assert BACKOFF_BASE - 1 <= retry_delay(row) <= BACKOFF_BASE * 2
+
+    make_due(message_id)
+    healthy = create_app()
+    assert drain(healthy) == 1
+    row = load(message_id)
+    assert (row.status, row.attempts, row.last_error) == ("sent", 3, None)
+    assert len(accepted(healthy)) == 1
+
+def test_dead_letters_after_max_attempts(caplog):
+    failing = create_app(fail_rate=1.0)
+    message_id = enqueue()
+
+    for attempt in range(1, settings.NOTIFY_MAX_ATTEMPTS + 1):
+        make_due(message_id)
+        with caplog.at_level(logging.ERROR, logger="app.services.notification_worker"):
+            assert drain(failing) == 1
+        assert load(message_id).attempts == attempt
+
+    row = load(message_id)
+    assert row.status == "dead"
+    assert row.last_error.startswith("HTTP 503")
+    assert "Dead-lettered email to customer@washwise.test" in caplog.text
+
+    make_due(message_id)
+    assert drain(failing) == 0
+
+def test_dead_letters_permanent_errors_right_away():
+    # A 4xx other than 429 fails the same way every time
+    rejecting = create_app(api_key="some-other-key")
+    message_id = enqueue()
+
+    assert drain(rejecting) == 1
+    row = load(message_id)
+    assert (row.status, row.attempts) == ("dead", 1)
+    assert row.last_error.startswith("HTTP 401")
+
+def test_unconfigured_mailgun_leaves_messages_pending(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "MAILGUN_API_KEY", None)
+    fake = create_app()
+    # Still written in the caller's transaction
+    message_id = enqueue()
+
+    with caplog.at_level(logging.WARNING, logger="app.services.notification_worker"):
+        assert drain(fake) == 0
+    row = load(message_id)
+    assert (row.status, row.attempts) == ("pending", 0)
+    assert "Mailgun configuration missing" in caplog.text
+    assert accepted(fake) == []
+
+    # Delivered once the configuration is in place
+    monkeypatch.setattr(settings, "MAILGUN_API_KEY", "key-test")
+    assert drain(fake) == 1
+    assert load(message_id).status == "sent"
@@ -0,0 +1,66 @@
+# tests/test_query_budget.py
+"""
+Per-endpoint query budgets (query_budgets.json) on real requests, and the
+counting they rely on staying in place with METRICS_ENABLED off.
+"""
+import uuid
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.query_budget import EndpointBudgets, QueryBudgetExceeded, endpoint_budgets
+from app.core.request_metrics import MetricsMiddleware
+from app.db.session import get_async_db
+from app.main import app
+
+@pytest.fixture
+def budgets():
+    """The checked-in budgets, enforced for this test (--query-budgets does it for the whole run)."""
+    was_enabled = endpoint_budgets.enabled
+    endpoint_budgets.enable()
+    yield endpoint_budgets
+    if not was_enabled:
+        endpoint_budgets.disable()
+
+def test_order_flow_within_budgets(budgets):
+    client = TestClient(app)
+    username = f"staff_{uuid.uuid4().hex[:8]}"
+    credentials = {"username": username, "password": "pw"}
+    assert client.post("/auth/register", json={**credentials, "email": f"{username}@example.com", "role": "serviceman"}).status_code == 200
+    headers = {"Authorization": f"Bearer {client.post('/auth/login', json=credentials).json()['access_token']}"}
+
+    order = client.post(
+        "/orders/",
+        json={"customer_username": username, "services": [{"service_name": "wash_and_fold", "quantity": 2}, {"service_name": "steam_iron", "quantity": 1}]},
+        headers=headers,
+    ).json()
+    assert client.get(f"/orders/qr/{order['id']}", headers=headers).status_code == 200
+    assert client.put(f"/orders/{order['id']}/pay", headers=headers).status_code == 200
+    assert client.get("/orders/", headers=headers).status_code == 200
+
+    # Counted (and so checked) on every one of them
+    for key in ("POST /auth/login", "POST /orders/", "GET /orders/qr/{order_id}", "PUT /orders/{order_id}/pay", "GET /orders/"):
+        assert key in budgets.observed
+
+def test_budgets_are_enforced_without_recording_metrics(tmp_path):
+    # What main.py installs when METRICS_ENABLED is off
+    two_queries = FastAPI()
+    two_queries.add_middleware(MetricsMiddleware, record=False)
+
+    @two_queries.get("/two")
+    async def run_two(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 2"))
+        return {}
+
+    budgets = EndpointBudgets(str(tmp_path / "budgets.json"))
+    budgets.enable()
+    budgets.budgets = {"GET /two": 1}
+    try:
+        with pytest.raises(QueryBudgetExceeded, match="GET /two: 2 queries, budget 1"):
+            TestClient(two_queries).get("/two")
+    finally:
+        budgets.disable()
@@ -0,0 +1,20 @@
+# tests/test_request_metrics.py
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+def test_slow_request_is_logged_with_its_sql(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SECONDS", 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.request_metrics"):
+        response = TestClient(app).post("/auth/login", json={"username": "nobody", "password": "pw"})
+
+    [record] = [r for r in caplog.records if r.name == "app.core.request_metrics"]
+    assert record.levelno == logging.WARNING
+    message = record.getMessage()
+    assert message.startswith(f"Slow request: POST /auth/login (/auth/login) -> {response.status_code} in ")
+    # The statements follow on continuation lines of the same record
+    assert "\n    [" in message and "FROM users" in message
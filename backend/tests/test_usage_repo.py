@@ -0,0 +1,36 @@
+# tests/test_usage_repo.py
+"""Claiming plan uses: one upsert per order, and no counter ever passes the limit."""
+import asyncio
+import uuid
+
+from app.db.session import AsyncSessionLocal, async_engine
+from app.repositories.usage_repo import usage_repo
+
+LIMIT = 4
+
+def claim(user_id: str, wanted: dict[str, int]) -> tuple[dict[str, int], dict[str, int]]:
+    """Claims in one committed transaction; returns (granted, counters afterwards)."""
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                granted = await usage_repo.claim_async(db, user_id, wanted, LIMIT)
+                await db.commit()
+                return granted, (await usage_repo.get_usage_async(db, [user_id])).get(user_id, {})
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(run())
+
+def test_claims_up_to_the_limit_per_service():
+    user_id = str(uuid.uuid4())
+
+    # New counters are inserted at what was asked for
+    assert claim(user_id, {"wash_and_fold": 3, "dry_cleaning": 1}) == ({"wash_and_fold": 3, "dry_cleaning": 1}, {"wash_and_fold": 3, "dry_cleaning": 1})
+    # Fits: added in full; would overshoot: only what is left
+    assert claim(user_id, {"wash_and_fold": 3, "dry_cleaning": 2}) == ({"wash_and_fold": 1, "dry_cleaning": 2}, {"wash_and_fold": 4, "dry_cleaning": 3})
+    # Nothing left for one, the rest for the other
+    assert claim(user_id, {"wash_and_fold": 1, "dry_cleaning": 5}) == ({"dry_cleaning": 1}, {"wash_and_fold": 4, "dry_cleaning": 4})
+    # More than the whole allowance on a fresh counter
+    assert claim(user_id, {"steam_iron": LIMIT + 2})[0] == {"steam_iron": LIMIT}
+
+def test_nothing_to_claim():
+    assert claim(str(uuid.uuid4()), {}) == ({}, {})
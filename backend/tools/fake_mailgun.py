@@ -0,0 +1,74 @@
+# tools/fake_mailgun.py
+"""
+Local stand-in for the Mailgun messages API, for exercising the notification
+worker without sending real email.
+
+    python -m tools.fake_mailgun --port 8025 --fail-rate 0.2 --latency-ms 50
+
+then run the backend with MAILGUN_API_BASE=http://127.0.0.1:8025/v3 (and any
+MAILGUN_API_KEY / MAILGUN_DOMAIN). Accepted messages are listed on
+GET /messages and cleared with DELETE /messages.
+"""
+import argparse
+import asyncio
+import base64
+import random
+import uuid
+from urllib.parse import parse_qs
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+def create_app(fail_rate: float = 0.0, latency_ms: int = 0, api_key: str = None) -> Starlette:
+    messages: list[dict] = []
+
+    async def send_message(request: Request):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+        auth = request.headers.get("authorization", "")
+        try:
+            user, _, key = base64.b64decode(auth.removeprefix("Basic ")).decode().partition(":")
+        except ValueError:
+            user, key = "", ""
+        if user != "api" or (api_key is not None and key != api_key):
+            return JSONResponse({"message": "Forbidden"}, status_code=401)
+
+        if random.random() < fail_rate:
+            return JSONResponse({"message": "Injected failure"}, status_code=503)
+
+        form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+        if not form.get("to"):
+            return JSONResponse({"message": "'to' parameter is missing"}, status_code=400)
+
+        message_id = f"<{uuid.uuid4()}@{request.path_params['domain']}>"
+        messages.append({"id": message_id, "domain": request.path_params["domain"], **form})
+        return JSONResponse({"id": message_id, "message": "Queued. Thank you."})
+
+    async def list_messages(request: Request):
+        return JSONResponse(messages)
+
+    async def clear_messages(request: Request):
+        messages.clear()
+        return JSONResponse({"message": "Cleared"})
+
+    return Starlette(routes=[
+        Route("/v3/{domain}/messages", send_message, methods=["POST"]),
+        Route("/messages", list_messages, methods=["GET"]),
+        Route("/messages", clear_messages, methods=["DELETE"]),
+    ])
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Mailgun messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of sends answered with 503")
+    parser.add_argument("--latency-ms", type=int, default=0, help="artificial delay per request")
+    parser.add_argument("--api-key", default=None, help="require this key (any key if omitted)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.fail_rate, args.latency_ms, args.api_key), host=args.host, port=args.port)
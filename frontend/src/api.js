@@ -71,7 +71,17 @@ export const purchaseSubscription = (plan) =>
 
 
 // --- ORDERS ---
-export const getOrders = () => api.get("/orders/");
+// Follows X-Next-Cursor through every page; resolves like api.get ({ data })
+export const getOrders = async () => {
+  const orders = [];
+  let cursor = null;
+  do {
+    const response = await api.get("/orders/", { params: cursor ? { cursor } : {} });
+    orders.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return { data: orders };
+};
 
 export const createOrder = (orderData) => 
   api.post("/orders/", orderData);